@@ -0,0 +1,152 @@
+"""
+    Batch Puzzle Solver
+
+    Solves many puzzles, one comma separated config per line, across a pool
+    of worker processes and streams one record per puzzle as it finishes.
+
+        python batch.py ast puzzles.txt --format csv > results.csv
+        cat puzzles.txt | python batch.py ida - --heuristic pdb
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from driver import (PuzzleState, SEARCH_METHODS, HEURISTIC_METHODS,
+                    COUNTER_FIELDS, solve)
+from utility.heuristics import HEURISTICS
+
+OUTPUT_FIELDS = (('index', 'puzzle', 'goal_found', 'path_to_goal',
+                  'cost_of_path', 'nodes_expanded', 'search_depth',
+                  'max_search_depth', 'running_time', 'max_ram_usage')
+                 + COUNTER_FIELDS + ('error',))
+
+
+def read_puzzles(puzzle_file):
+    """
+        Yields (index, config, error) for every non-blank, non-comment line.
+        A line that is not a list of integers comes back as itself, with the
+        reason in error, so the batch can report it and carry on.
+    """
+    for index, line in enumerate(puzzle_file):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield index, tuple(map(int, line.split(','))), None
+        except ValueError as error:
+            yield index, line, f"Malformed puzzle: {error}"
+
+
+def solve_puzzle(index, config, method, options):
+    """
+        Worker entry point. Runs in a pool process, where the heuristic
+        tables loaded by earlier tasks are still cached.
+    """
+    record = dict(index=index, puzzle=','.join(map(str, config)))
+    try:
+        size = int(math.sqrt(len(config)))
+        result = solve(method, PuzzleState(config, size), **options)
+    except Exception as error:
+        record.update(goal_found=False, error=str(error))
+        return record
+
+    record['goal_found'] = result is not None
+    if result is None:
+        record['error'] = 'Puzzle is not solvable'
+    else:
+        record.update(result)
+    return record
+
+
+class RecordWriter:
+
+    def __init__(self, output_file, output_format):
+        self.output_file = output_file
+        self.output_format = output_format
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(output_file,
+                                             fieldnames=OUTPUT_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record):
+        if self.output_format == 'csv':
+            row = dict(record)
+            if 'path_to_goal' in row:
+                row['path_to_goal'] = ' '.join(row['path_to_goal'])
+            self.csv_writer.writerow(row)
+        else:
+            self.output_file.write(json.dumps(record) + '\n')
+        self.output_file.flush()
+
+
+def run_batch(puzzles, method, writer, workers=None, options=None):
+    """
+        Keeps a bounded number of puzzles in flight and writes each record
+        as soon as its puzzle is solved
+    """
+    options = options or dict()
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for index, config, error in puzzles:
+            if error is not None:
+                writer.write(dict(index=index, puzzle=config,
+                                  goal_found=False, error=error))
+                continue
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    writer.write(future.result())
+            in_flight.add(executor.submit(solve_puzzle, index, config,
+                                          method, options))
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                writer.write(future.result())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve puzzles in batch")
+    parser.add_argument('method', choices=sorted(SEARCH_METHODS))
+    parser.add_argument('puzzles', help="file of puzzle configs, - for stdin")
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        default='jsonl')
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes, defaults to the core count")
+    parser.add_argument('--heuristic', choices=list(HEURISTICS),
+                        default=None,
+                        help="heuristic for ast, ida and hda")
+    parser.add_argument('--output', default=None,
+                        help="output file, defaults to stdout")
+    args = parser.parse_args(argv)
+
+    options = dict()
+    if args.heuristic:
+        if args.method not in HEURISTIC_METHODS:
+            parser.error("--heuristic only applies to "
+                         f"{', '.join(HEURISTIC_METHODS)}")
+        options['heuristic'] = args.heuristic
+
+    puzzle_file = sys.stdin if args.puzzles == '-' else open(args.puzzles)
+    output_file = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        writer = RecordWriter(output_file, args.format)
+        run_batch(read_puzzles(puzzle_file), args.method, writer,
+                  workers=args.workers, options=options)
+    finally:
+        if puzzle_file is not sys.stdin:
+            puzzle_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
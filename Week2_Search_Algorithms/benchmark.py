@@ -0,0 +1,284 @@
+"""
+    Search Benchmark
+
+    Runs every search method and heuristic over a fixed corpus of 8-puzzle
+    and 15-puzzle instances bucketed by optimal depth, and compares the
+    results with a stored baseline. Searches that would take minutes or run
+    out of memory on the deepest buckets stop at a shallower one.
+
+        python benchmark.py --generate-corpus
+        python benchmark.py --save-baseline
+        python benchmark.py --sizes 3 --baseline benchmarks/baseline.json
+
+    Each case runs in a fresh worker process, so wall time and peak RSS are
+    not skewed by earlier cases. The pattern database and solution table
+    cases are skipped until those tables are built.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from driver import PuzzleState, solve
+from utility.ida_star import IDAStar
+from utility.packed_board import (pack, unpack, slide, move_table, goal_config,
+                                  is_solvable)
+from utility.pattern_database import default_path
+from utility import solution_table
+
+BENCHMARK_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'benchmarks')
+CORPUS_PATH = os.path.join(BENCHMARK_DIRECTORY, 'corpus.json')
+BASELINE_PATH = os.path.join(BENCHMARK_DIRECTORY, 'baseline.json')
+
+CORPUS_SEED = 2020
+INSTANCES_PER_BUCKET = 3
+DEPTH_BUCKETS = {3: (10, 20, 26), 4: (20, 30, 36)}
+
+# (method, heuristic, board size, deepest bucket worth running)
+CASES = (
+    ('bfs', None, 3, None),
+    ('lbfs', None, 3, None),
+    ('dfs', None, 3, None),
+    ('iddfs', None, 3, 20),
+    ('bibfs', None, 3, None),
+    ('bibfs', None, 4, 30),
+    ('table', None, 3, None),
+    ('ast', 'misplaced', 3, None),
+    ('ast', 'misplaced', 4, 20),
+    ('ast', 'manhattan', 3, None),
+    ('ast', 'manhattan', 4, None),
+    ('ast', 'linear', 3, None),
+    ('ast', 'linear', 4, None),
+    ('ast', 'walking', 3, None),
+    ('ast', 'walking', 4, None),
+    ('ast', 'pdb', 3, None),
+    ('ast', 'pdb', 4, None),
+    ('ida', 'manhattan', 3, None),
+    ('ida', 'manhattan', 4, None),
+    ('ida', 'pdb', 3, None),
+    ('ida', 'pdb', 4, None),
+    ('hda', 'manhattan', 3, None),
+    ('hda', 'manhattan', 4, None),
+)
+
+# Parallel searches, whose expansions vary from run to run
+PARALLEL_METHODS = ('hda',)
+
+
+def optimal_depth(config, n):
+    state = PuzzleState(config, n)
+    heuristic = 'pdb' if os.path.exists(default_path(n)) else 'manhattan'
+    (_, path_to_goal, _, _, _) = IDAStar(state, goal_config(n),
+                                         heuristic=heuristic).search()
+    return len(path_to_goal)
+
+
+def _random_board(n, rng, depth):
+    """
+        8-puzzles are drawn uniformly; 15-puzzles are scrambled with a random
+        walk, since uniform ones are far too deep to solve routinely
+    """
+    if n == 3:
+        while True:
+            config = list(range(n * n))
+            rng.shuffle(config)
+            if is_solvable(config, n):
+                return tuple(config)
+
+    moves = move_table(n)
+    key, blank = pack(goal_config(n)), 0
+    for _ in range(depth * 2):
+        _action, target = rng.choice(moves[blank])
+        key, blank = slide(key, blank, target), target
+    return unpack(key, n)
+
+
+def generate_corpus(seed=CORPUS_SEED, per_bucket=INSTANCES_PER_BUCKET):
+    rng = random.Random(seed)
+    corpus = []
+    for n, depths in sorted(DEPTH_BUCKETS.items()):
+        for depth in depths:
+            found = 0
+            while found < per_bucket:
+                config = _random_board(n, rng, depth)
+                if optimal_depth(config, n) != depth:
+                    continue
+                corpus.append(dict(n=n, depth=depth, config=list(config)))
+                found += 1
+    return dict(seed=seed, instances=corpus)
+
+
+def _run_case(method, heuristic, config, n):
+    """
+        Worker entry point, one fresh process per case. Not a
+        multiprocessing.Pool worker: those are daemons, which hda's own
+        workers could not be started from.
+    """
+    options = dict(heuristic=heuristic) if heuristic else dict()
+    start_time = time.time()
+    result = solve(method, PuzzleState(tuple(config), n), **options)
+    wall_time = time.time() - start_time
+    return dict(expansions=result['nodes_expanded'],
+                cost_of_path=result['cost_of_path'],
+                wall_time=wall_time,
+                peak_memory_mb=result['max_ram_usage'])
+
+
+def case_name(method, heuristic, n, depth):
+    name = f'{n * n - 1}-puzzle/depth-{depth}/{method}'
+    return f'{name}/{heuristic}' if heuristic else name
+
+
+def run_benchmark(corpus, sizes=None, methods=None):
+    results = dict()
+    for method, heuristic, n, max_depth in CASES:
+        if (sizes and n not in sizes) or (methods and
+                                          method not in methods):
+            continue
+        if heuristic == 'pdb' and not os.path.exists(default_path(n)):
+            print(f"Skipping {method}/pdb on size {n}, no pattern "
+                  "database built", file=sys.stderr)
+            continue
+        if method == 'table' and not os.path.exists(
+                solution_table.default_path(n)):
+            print(f"Skipping table on size {n}, no solution table built",
+                  file=sys.stderr)
+            continue
+
+        for depth in DEPTH_BUCKETS[n]:
+            if max_depth is not None and depth > max_depth:
+                continue
+            instances = [instance for instance in corpus['instances']
+                         if instance['n'] == n and
+                         instance['depth'] == depth]
+            runs = []
+            for instance in instances:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    runs.append(executor.submit(
+                        _run_case, method, heuristic, instance['config'],
+                        n).result())
+
+            name = case_name(method, heuristic, n, depth)
+            expansions = sum(run['expansions'] for run in runs)
+            wall_time = sum(run['wall_time'] for run in runs)
+            results[name] = dict(
+                instances=len(runs),
+                expansions=expansions,
+                deterministic=method not in PARALLEL_METHODS,
+                wall_time=wall_time,
+                nodes_per_second=expansions / wall_time if wall_time
+                else 0.0,
+                peak_memory_mb=max(run['peak_memory_mb'] for run in runs),
+                mean_cost=sum(run['cost_of_path'] for run in runs)
+                / len(runs))
+            print(f"{name:45} {expansions:>10} nodes "
+                  f"{wall_time:8.3f} s "
+                  f"{results[name]['peak_memory_mb']:8.2f} MB",
+                  file=sys.stderr)
+    return results
+
+
+def find_regressions(results, baseline, tolerance=0.25, time_slack=0.05,
+                     memory_slack_mb=1.0):
+    """
+        Expansions and path costs are deterministic and must not grow at
+        all, except the expansions of parallel searches, which may grow by
+        tolerance like wall time and peak memory. Those may also grow by a
+        small absolute slack, since the quickest cases sit at timer and
+        rusage resolution.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        expansion_limit = previous['expansions']
+        if not result.get('deterministic', True):
+            expansion_limit *= 1 + tolerance
+        if result['expansions'] > expansion_limit:
+            regressions.append(f"{name}: expansions {previous['expansions']}"
+                               f" -> {result['expansions']}")
+        if result['mean_cost'] > previous['mean_cost']:
+            regressions.append(f"{name}: mean path cost "
+                               f"{previous['mean_cost']} -> "
+                               f"{result['mean_cost']}")
+        time_limit = previous['wall_time'] * (1 + tolerance) + time_slack
+        if result['wall_time'] > time_limit:
+            regressions.append(f"{name}: wall time "
+                               f"{previous['wall_time']:.3f} s -> "
+                               f"{result['wall_time']:.3f} s")
+        memory_limit = (previous['peak_memory_mb'] * (1 + tolerance)
+                        + memory_slack_mb)
+        if result['peak_memory_mb'] > memory_limit:
+            regressions.append(f"{name}: peak memory "
+                               f"{previous['peak_memory_mb']:.2f} MB -> "
+                               f"{result['peak_memory_mb']:.2f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the searches")
+    parser.add_argument('--generate-corpus', action='store_true',
+                        help=f"regenerate {CORPUS_PATH} and exit")
+    parser.add_argument('--sizes', type=int, nargs='+', default=None)
+    parser.add_argument('--methods', nargs='+', default=None)
+    parser.add_argument('--output', default=None,
+                        help="write the results JSON here")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative growth of time and memory")
+    args = parser.parse_args(argv)
+
+    if args.generate_corpus:
+        os.makedirs(BENCHMARK_DIRECTORY, exist_ok=True)
+        with open(CORPUS_PATH, 'w') as corpus_file:
+            json.dump(generate_corpus(), corpus_file, indent=1)
+        print(f"Corpus written to {CORPUS_PATH}")
+        return
+
+    with open(CORPUS_PATH) as corpus_file:
+        corpus = json.load(corpus_file)
+
+    results = run_benchmark(corpus, sizes=args.sizes, methods=args.methods)
+    report = dict(python=platform.python_version(),
+                  machine=platform.machine(),
+                  date=time.strftime('%Y-%m-%d %H:%M:%S'),
+                  results=results)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline")
+        sys.exit(1)
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = find_regressions(results, baseline,
+                                   tolerance=args.tolerance)
+    if regressions:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,143 +1,123 @@
+import argparse
 import sys
 import time
 from resource import getrusage, RUSAGE_SELF
 import math
 
 from utility.bfs import BFS
+from utility.bidirectional_bfs import BidirectionalBFS
 from utility.dfs import DFS
+from utility.iddfs import IDDFS
 from utility.a_star import AStar
+from utility.ida_star import IDAStar
+from utility.parallel_a_star import ParallelAStar
+from utility.solution_table import TableSearch, \
+    MAX_DIMENSION as TABLE_MAX_DIMENSION
+from utility.solution_cache import SolutionCache, DEFAULT_CACHE_PATH
 from utility.priority_queue import PriorityQueue
+from utility.instrumentation import Instrumentation, MEMORY_SAMPLERS
+from utility.heuristics import HEURISTICS
+from utility.packed_board import (pack, unpack, slide, move_table, goal_config,
+                                  is_solvable, MAX_DIMENSION, MOVE_ORDER,
+                                  ALTERNATE_MOVE_ORDER)
 
 
 # The Class that Represents the Puzzle
 class PuzzleState(object):
 
-    """docstring for PuzzleState"""
+    """
+        A puzzle board bit-packed into a single int (see utility.packed_board)
+    """
+
+    __slots__ = ('n', 'cost', 'parent', 'action', 'key', 'blank_index', 'h')
 
     def __init__(self, config, n, parent=None, action="Initial", cost=0):
 
         if n*n != len(config) or n < 2:
             raise Exception("the length of config is not correct!")
 
+        if n > MAX_DIMENSION:
+            raise Exception("only boards up to 4x4 can be bit-packed!")
+
         self.n = n
         self.cost = cost
         self.parent = parent
         self.action = action
-        self.dimension = n
-        self.config = config
-        self.children = []
+        self.key = pack(config)
+        self.blank_index = list(config).index(0)
+        # Heuristic cost, filled in lazily by the informed searches
+        self.h = None
+
+    def is_solvable(self, goal_state=None):
+        return is_solvable(self.config, self.n, goal_state)
+
+    @property
+    def dimension(self):
+        return self.n
+
+    @property
+    def config(self):
+        return unpack(self.key, self.n)
+
+    @property
+    def blank_row(self):
+        return self.blank_index // self.n
 
-        for i, item in enumerate(self.config):
-            if item == 0:
-                self.blank_row = i // self.n
-                self.blank_col = i % self.n
-                break
+    @property
+    def blank_col(self):
+        return self.blank_index % self.n
 
     def display(self):
 
+        config = self.config
         for i in range(self.n):
-            line = []
             offset = i * self.n
-
-            for j in range(self.n):
-                line.append(self.config[offset + j])
-            print(line)
+            print(list(config[offset:offset + self.n]))
+
+    def _slide(self, target, action, link_parent=True):
+        child = PuzzleState.__new__(PuzzleState)
+        child.n = self.n
+        child.cost = self.cost + 1
+        child.parent = self if link_parent else None
+        child.action = action
+        child.key = slide(self.key, self.blank_index, target)
+        child.blank_index = target
+        child.h = None
+        return child
 
     def move_left(self):
 
         if self.blank_col == 0:
             return None
-
-        blank_index = self.blank_row * self.n + self.blank_col
-        target = blank_index - 1
-        new_config = list(self.config)
-        new_config[blank_index], new_config[target] = (new_config[target],
-                                                       new_config[blank_index])
-        return PuzzleState(tuple(new_config), self.n, parent=self,
-                           action="Left", cost=self.cost + 1)
+        return self._slide(self.blank_index - 1, "Left")
 
     def move_right(self):
 
         if self.blank_col == self.n - 1:
             return None
-
-        blank_index = self.blank_row * self.n + self.blank_col
-        target = blank_index + 1
-        new_config = list(self.config)
-        new_config[blank_index], new_config[target] = (new_config[target],
-                                                       new_config[blank_index])
-        return PuzzleState(tuple(new_config), self.n, parent=self,
-                           action="Right", cost=self.cost + 1)
+        return self._slide(self.blank_index + 1, "Right")
 
     def move_up(self):
 
         if self.blank_row == 0:
             return None
-
-        blank_index = self.blank_row * self.n + self.blank_col
-        target = blank_index - self.n
-        new_config = list(self.config)
-        new_config[blank_index], new_config[target] = (new_config[target],
-                                                       new_config[blank_index])
-        return PuzzleState(tuple(new_config), self.n, parent=self,
-                           action="Up", cost=self.cost + 1)
+        return self._slide(self.blank_index - self.n, "Up")
 
     def move_down(self):
 
         if self.blank_row == self.n - 1:
             return None
+        return self._slide(self.blank_index + self.n, "Down")
 
-        blank_index = self.blank_row * self.n + self.blank_col
-        target = blank_index + self.n
-        new_config = list(self.config)
-        new_config[blank_index], new_config[target] = (new_config[target],
-                                                       new_config[blank_index])
-        return PuzzleState(tuple(new_config), self.n, parent=self,
-                           action="Down", cost=self.cost + 1)
-
-    def expand(self, change_order=False):
+    def expand(self, change_order=False, link_parent=True):
         """expand the node"""
 
-        # add child nodes in order of ULDR
-        if not change_order:
-            if len(self.children) == 0:
-
-                up_child = self.move_up()
-                if up_child is not None:
-                    self.children.append(up_child)
-
-                down_child = self.move_down()
-                if down_child is not None:
-                    self.children.append(down_child)
-
-                left_child = self.move_left()
-                if left_child is not None:
-                    self.children.append(left_child)
-
-                right_child = self.move_right()
-                if right_child is not None:
-                    self.children.append(right_child)
-
-        else:
-            if len(self.children) == 0:
-
-                up_child = self.move_up()
-                if up_child is not None:
-                    self.children.append(up_child)
-
-                left_child = self.move_left()
-                if left_child is not None:
-                    self.children.append(left_child)
-
-                down_child = self.move_down()
-                if down_child is not None:
-                    self.children.append(down_child)
-
-                right_child = self.move_right()
-                if right_child is not None:
-                    self.children.append(right_child)
-
-        return self.children
+        # add child nodes in order of UDLR, or ULDR when change_order is set.
+        # Unlinked children let this node be freed once it is expanded.
+        order = ALTERNATE_MOVE_ORDER if change_order else MOVE_ORDER
+        moves = move_table(self.n, order)[self.blank_index]
+        return [self._slide(target, action, link_parent)
+                for action, target in moves]
 
 
 # Function that Writes to output.txt
@@ -153,6 +133,11 @@ def writeOutput(file_prefix='', print_output=False, **kwargs):
     output_lines.append(f'running_time: {kwargs.get("running_time", float("Inf"))}')
     output_lines.append(f'max_ram_usage: {kwargs.get("max_ram_usage", float("Inf"))}')
 
+    # Instrumentation counters follow the graded fields when reported
+    for field in COUNTER_FIELDS:
+        if field in kwargs:
+            output_lines.append(f'{field}: {kwargs[field]}')
+
     filename = f"{file_prefix}_output.txt" if file_prefix else "output.txt"
 
     with open(filename, 'w') as output_file:
@@ -166,108 +151,208 @@ def writeOutput(file_prefix='', print_output=False, **kwargs):
         print(f'Max Search Depth: {kwargs.get("max_search_depth", 0)}')
         print(f'Running Time: {kwargs.get("running_time", float("Inf"))}')
         print(f'Max RAM Usage: {kwargs.get("max_ram_usage", float("Inf"))}')
+        for field in COUNTER_FIELDS:
+            if field in kwargs:
+                print(f'{field.replace("_", " ").title()}: {kwargs[field]}')
 
 
-def bfs_search(initial_state):
-    """BFS search"""
+COUNTER_FIELDS = ('nodes_generated', 'duplicate_nodes', 'max_frontier_size')
 
-    goal_state = (0, 1, 2, 3, 4, 5, 6, 7, 8)
 
-    start_time = time.time()
+def _layer_bfs(*args, **kwargs):
+    # Imported on first use: only this search needs NumPy, which is slow to
+    # load
+    from utility.layer_bfs import LayerBFS
+    return LayerBFS(*args, **kwargs)
 
-    start_ram_usage = getrusage(RUSAGE_SELF).ru_maxrss
-    bfs_tree = BFS(initial_state=initial_state,
-                   goal_state=goal_state,
-                   start_ram_usage=start_ram_usage)
 
-    (goal_found, path_to_goal,
-     path_cost, nodes_expanded,
-     search_depth) = bfs_tree.search(display_path=False)
+SEARCH_METHODS = {
+    'bfs': BFS,
+    'bibfs': BidirectionalBFS,
+    'lbfs': _layer_bfs,
+    'dfs': DFS,
+    'iddfs': IDDFS,
+    'ast': AStar,
+    'ida': IDAStar,
+    'hda': ParallelAStar,
+    'table': TableSearch
+}
 
-    running_time = time.time() - start_time
-    max_search_depth = bfs_tree.get_max_search_depth()
-    max_ram_usage = bfs_tree.get_max_ram_usage()/1024
+# Searches that can trade parent links for a predecessor table
+RECORDING_METHODS = ('bfs', 'dfs', 'ast')
 
-    if not goal_found:
-        print('Puzzle is not solvable')
-        return
+# Searches guided by a heuristic from utility.heuristics
+HEURISTIC_METHODS = ('ast', 'ida', 'hda')
 
-    writeOutput(file_prefix='',
-                path_to_goal=path_to_goal,
-                cost_of_path=path_cost,
-                nodes_expanded=nodes_expanded,
-                search_depth=search_depth,
-                max_search_depth=max_search_depth,
-                running_time=running_time,
-                max_ram_usage=max_ram_usage)
+# Searches whose paths are optimal, so their answers may be cached
+CACHED_METHODS = ('bfs', 'bibfs', 'lbfs', 'iddfs', 'ast', 'ida', 'hda')
 
 
-def dfs_search(initial_state):
-    """DFS search"""
+def solve(method, initial_state, instrumentation=None, cache=None,
+          **options):
+    """
+        Runs one search, returning the writeOutput fields or None when the
+        goal was not found. With a SolutionCache, optimal searches are
+        answered from it when possible and store their paths in it.
+    """
+
+    goal_state = goal_config(initial_state.n)
 
-    goal_state = (0, 1, 2, 3, 4, 5, 6, 7, 8)
+    # Unsolvable boards would sweep the whole reachable state space
+    if not initial_state.is_solvable(goal_state):
+        return None
 
     start_time = time.time()
 
     start_ram_usage = getrusage(RUSAGE_SELF).ru_maxrss
-    dfs_tree = DFS(initial_state=initial_state,
-                   goal_state=goal_state,
-                   start_ram_usage=start_ram_usage)
+    instrumentation = instrumentation or Instrumentation(
+        start_ram_usage=start_ram_usage)
+
+    if cache is not None and method in CACHED_METHODS:
+        path_to_goal = cache.get(initial_state.key, initial_state.n)
+        if path_to_goal is not None:
+            return dict(path_to_goal=path_to_goal,
+                        cost_of_path=len(path_to_goal),
+                        nodes_expanded=0,
+                        search_depth=len(path_to_goal),
+                        max_search_depth=len(path_to_goal),
+                        running_time=time.time() - start_time,
+                        max_ram_usage=instrumentation.peak_memory/1024,
+                        nodes_generated=0,
+                        duplicate_nodes=0,
+                        max_frontier_size=0)
+
+    search_tree = SEARCH_METHODS[method](initial_state=initial_state,
+                                         goal_state=goal_state,
+                                         start_ram_usage=start_ram_usage,
+                                         instrumentation=instrumentation,
+                                         **options)
 
     (goal_found, path_to_goal,
      path_cost, nodes_expanded,
-     search_depth) = dfs_tree.search(display_path=False)
+     search_depth) = search_tree.search(display_path=False)
 
     running_time = time.time() - start_time
-    max_search_depth = dfs_tree.get_max_search_depth()
-    max_ram_usage = dfs_tree.get_max_ram_usage()/1024
 
     if not goal_found:
-        print('Puzzle is not solvable')
-        return
+        return None
+
+    if cache is not None and method in CACHED_METHODS:
+        cache.put(initial_state.config, initial_state.n, path_to_goal)
 
-    writeOutput(file_prefix='',
-                path_to_goal=path_to_goal,
+    return dict(path_to_goal=path_to_goal,
                 cost_of_path=path_cost,
                 nodes_expanded=nodes_expanded,
                 search_depth=search_depth,
-                max_search_depth=max_search_depth,
+                max_search_depth=search_tree.get_max_search_depth(),
                 running_time=running_time,
-                max_ram_usage=max_ram_usage)
+                max_ram_usage=search_tree.get_max_ram_usage()/1024,
+                nodes_generated=instrumentation.generations,
+                duplicate_nodes=instrumentation.duplicates,
+                max_frontier_size=instrumentation.max_frontier_size)
 
 
-def A_star_search(initial_state):
+def run_search(method, initial_state, stats_path=None, **options):
+    """
+        Solves initial_state and writes output.txt, plus the instrumentation
+        counters as JSON when stats_path is given
+    """
+
+    instrumentation = options.pop('instrumentation', None) or \
+        Instrumentation(start_ram_usage=getrusage(RUSAGE_SELF).ru_maxrss)
+    result = solve(method, initial_state, instrumentation=instrumentation,
+                   **options)
+
+    if result is None:
+        print('Puzzle is not solvable')
+        return
+
+    writeOutput(file_prefix='', **result)
+
+    if stats_path:
+        instrumentation.dump_json(stats_path, method=method,
+                                  puzzle=list(initial_state.config),
+                                  cost_of_path=result['cost_of_path'])
+
+
+def compare_heuristics(method, initial_state, **options):
+    """
+        Solves initial_state once per heuristic and prints the work each
+        one took, skipping those whose tables are not built
+    """
+
+    # Every run gets fresh counters, and nothing is written out
+    for option in ('instrumentation', 'stats_path', 'heuristic'):
+        options.pop(option, None)
+
+    print(f"{'heuristic':12} {'expanded':>10} {'generated':>10} "
+          f"{'cost':>5} {'time (s)':>9}")
+    for name in HEURISTICS:
+        try:
+            result = solve(method, initial_state, heuristic=name, **options)
+        except Exception as error:
+            print(f"{name:12} skipped: {error}")
+            continue
+        if result is None:
+            print('Puzzle is not solvable')
+            return
+        print(f"{name:12} {result['nodes_expanded']:>10} "
+              f"{result['nodes_generated']:>10} "
+              f"{result['cost_of_path']:>5} {result['running_time']:>9.3f}")
+
+
+def bfs_search(initial_state, **options):
+    """BFS search"""
+
+    run_search('bfs', initial_state, **options)
+
+
+def bibfs_search(initial_state, **options):
+    """Bidirectional BFS search"""
+
+    run_search('bibfs', initial_state, **options)
+
+
+def lbfs_search(initial_state, **options):
+    """Layer synchronous NumPy BFS search"""
+
+    run_search('lbfs', initial_state, **options)
+
+
+def dfs_search(initial_state, **options):
+    """DFS search"""
+
+    run_search('dfs', initial_state, **options)
+
+
+def iddfs_search(initial_state, **options):
+    """Iterative deepening DFS search"""
+
+    run_search('iddfs', initial_state, **options)
+
+
+def A_star_search(initial_state, **options):
     """A * search"""
 
-    goal_state = (0, 1, 2, 3, 4, 5, 6, 7, 8)
+    run_search('ast', initial_state, **options)
 
-    start_time = time.time()
 
-    start_ram_usage = getrusage(RUSAGE_SELF).ru_maxrss
-    astar_tree = AStar(initial_state=initial_state,
-                       goal_state=goal_state,
-                       start_ram_usage=start_ram_usage)
+def ida_search(initial_state, **options):
+    """IDA * search"""
 
-    (goal_found, path_to_goal,
-     path_cost, nodes_expanded,
-     search_depth) = astar_tree.search(display_path=False)
+    run_search('ida', initial_state, **options)
 
-    running_time = time.time() - start_time
-    max_search_depth = astar_tree.get_max_search_depth()
-    max_ram_usage = astar_tree.get_max_ram_usage()/1024
 
-    if not goal_found:
-        print('Puzzle is not solvable')
-        return
+def hda_search(initial_state, **options):
+    """Hash distributed parallel A * search"""
 
-    writeOutput(file_prefix='',
-                path_to_goal=path_to_goal,
-                cost_of_path=path_cost,
-                nodes_expanded=nodes_expanded,
-                search_depth=search_depth,
-                max_search_depth=max_search_depth,
-                running_time=running_time,
-                max_ram_usage=max_ram_usage)
+    run_search('hda', initial_state, **options)
+
+
+def table_search(initial_state, **options):
+    """Precomputed solution table lookup"""
+
+    run_search('table', initial_state, **options)
 
 
 def calculate_total_cost(state):
@@ -288,6 +373,42 @@ def test_goal(puzzle_state):
     raise NotImplementedError("{}".format(__name__))
 
 
+def parse_options(argv):
+    """
+        Optional flags following the method and the puzzle
+    """
+    parser = argparse.ArgumentParser(prog='driver.py <method> <puzzle>')
+    parser.add_argument('--memory', choices=sorted(MEMORY_SAMPLERS),
+                        default='rusage',
+                        help="how peak memory is measured")
+    parser.add_argument('--sample-interval', type=int, default=1000,
+                        help="expansions between memory samples")
+    parser.add_argument('--sample-period', type=float, default=None,
+                        help="sample memory from a background thread every "
+                             "this many seconds instead")
+    parser.add_argument('--stats-json', default=None,
+                        help="also dump the search counters to this file")
+    parser.add_argument('--record-moves', action='store_true',
+                        help="bfs, dfs and ast: rebuild the path from a "
+                             "table of moves instead of parent links, a "
+                             "cheap toggle that saves a little memory")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="hda: worker processes, defaults to the core "
+                             "count")
+    parser.add_argument('--heuristic', choices=list(HEURISTICS),
+                        default=None,
+                        help="ast, ida and hda: the heuristic to search "
+                             "with, manhattan by default")
+    parser.add_argument('--compare-heuristics', action='store_true',
+                        help="ast, ida and hda: report the nodes expanded "
+                             "with every heuristic instead")
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH,
+                        default=None,
+                        help="answer optimal searches from, and save their "
+                             "paths to, this SQLite solution cache")
+    return parser.parse_args(argv)
+
+
 # Main Function that reads in Input and Runs corresponding Algorithm
 def main():
 
@@ -301,18 +422,76 @@ def main():
     size = int(math.sqrt(len(begin_state)))
     hard_state = PuzzleState(begin_state, size)
 
+    args = parse_options(sys.argv[3:])
+    if sm == 'table' and size > TABLE_MAX_DIMENSION:
+        print(f"table only applies to boards up to {TABLE_MAX_DIMENSION}x"
+              f"{TABLE_MAX_DIMENSION}")
+        exit(1)
+    instrumentation = Instrumentation(
+        memory=args.memory,
+        sample_interval=args.sample_interval,
+        sample_period=args.sample_period,
+        start_ram_usage=getrusage(RUSAGE_SELF).ru_maxrss)
+    options = dict(instrumentation=instrumentation,
+                   stats_path=args.stats_json)
+    if args.record_moves:
+        if sm not in RECORDING_METHODS:
+            print("--record-moves only applies to "
+                  f"{', '.join(RECORDING_METHODS)}")
+            exit(1)
+        options['record_moves'] = True
+    if args.workers is not None:
+        if sm != 'hda':
+            print("--workers only applies to hda")
+            exit(1)
+        options['workers'] = args.workers
+    if args.heuristic or args.compare_heuristics:
+        if sm not in HEURISTIC_METHODS:
+            print("--heuristic and --compare-heuristics only apply to "
+                  f"{', '.join(HEURISTIC_METHODS)}")
+            exit(1)
+    if args.heuristic:
+        options['heuristic'] = args.heuristic
+    if args.compare_heuristics:
+        compare_heuristics(sm, hard_state, **options)
+        return
+    if args.cache:
+        options['cache'] = SolutionCache(args.cache)
+
     if sm == "bfs":
-        bfs_search(hard_state)
+        bfs_search(hard_state, **options)
+
+    elif sm == "bibfs":
+        bibfs_search(hard_state, **options)
+
+    elif sm == "lbfs":
+        lbfs_search(hard_state, **options)
 
     elif sm == "dfs":
-        dfs_search(hard_state)
+        dfs_search(hard_state, **options)
+
+    elif sm == "iddfs":
+        iddfs_search(hard_state, **options)
 
     elif sm == "ast":
-        A_star_search(hard_state)
+        A_star_search(hard_state, **options)
+
+    elif sm == "ida":
+        ida_search(hard_state, **options)
+
+    elif sm == "hda":
+        hda_search(hard_state, **options)
+
+    elif sm == "table":
+        table_search(hard_state, **options)
 
     else:
         print("Enter valid command arguments !")
 
+    if args.cache:
+        # Writes the hits' last use times
+        options['cache'].close()
+
 
 if __name__ == '__main__':
     main()
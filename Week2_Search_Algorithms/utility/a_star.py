@@ -3,100 +3,105 @@
     A* Search
 """
 
-from utility.priority_queue import PriorityQueue
-from resource import getrusage, RUSAGE_SELF
+from utility.priority_queue import BucketPriorityQueue
+
+from utility.packed_board import pack
+from utility.heuristics import get_heuristic
+from utility.instrumentation import Instrumentation
+from utility.predecessor_table import PredecessorTable
 
 
 class AStar:
 
-    __slots__ = ('initial_state', 'goal_state', 'start_ram_usage',
-                 'nodes_expanded', 'max_ram_usage', 'max_search_depth',
-                 'visited_nodes', 'current_state', 'frontier', 'frontier_map')
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth',
+                 'visited_nodes', 'current_state', 'frontier', 'frontier_map',
+                 'heuristic', 'instrumentation', 'predecessors')
 
-    def __init__(self, initial_state, goal_state, start_ram_usage):
+    def __init__(self, initial_state, goal_state, start_ram_usage,
+                 heuristic='manhattan', instrumentation=None,
+                 record_moves=False):
         self.initial_state = initial_state
         self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
         self.start_ram_usage = start_ram_usage
         self.nodes_expanded = 0
-        self.max_ram_usage = 0
         self.max_search_depth = 0
         self.visited_nodes = set()
+        # Cheapest known path cost g of every generated board
         self.frontier_map = dict()
+        # With record_moves, see utility.predecessor_table
+        self.predecessors = None
+        if record_moves:
+            self.predecessors = PredecessorTable(initial_state.key,
+                                                 initial_state.n)
+            self.visited_nodes = self.predecessors
         self.current_state = self.initial_state
-        self.frontier = PriorityQueue()
-
-    def _get_target_tile_position(self, tile):
-
-        _tile_positions = {
-            '1': (0, 1),
-            '2': (0, 2),
-            '3': (1, 0),
-            '4': (1, 1),
-            '5': (1, 2),
-            '6': (2, 0),
-            '7': (2, 1),
-            '8': (2, 2)
-        }
-        return _tile_positions.get(tile, (-1, -1))
-
-    def _calc_manhattan_distance(self, idx, value, n):
-        """
-            Calculates manhattan distance of a tile
-        """
-        t_row, t_col = self._get_target_tile_position(value)
-        row_moves = abs((idx // n) - t_row)
-        col_moves = abs((idx % n) - t_col)
-        return row_moves + col_moves
+        self.frontier = BucketPriorityQueue()
+        self.heuristic = get_heuristic(heuristic, goal_state, initial_state.n)
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
 
     def _get_heuristic_cost(self, state):
-
-        h_cost = 0
-        n = state.n
-
-        for idx, value in enumerate(state.config):
-            _m_cost = self._calc_manhattan_distance(idx, value, n)
-            h_cost += _m_cost
-        return h_cost
+        if state.h is None:
+            state.h = self.heuristic.cost(state.key)
+        return state.h
 
     def _get_total_cost(self, state):
         return state.cost + self._get_heuristic_cost(state)
 
-    def _misplaced_tiles(self):
-        """
-            Heuristic Function 2
-        """
-        pass
-
     def _expand_current_node(self):
 
-        children = self.current_state.expand()
+        parent = self.current_state
+        children = parent.expand(link_parent=self.predecessors is None)
 
         self.nodes_expanded += 1
+        instrumentation = self.instrumentation
+        instrumentation.generations += len(children)
         for child in children:
-            if tuple(child.config) not in self.visited_nodes and \
-                    tuple(child.config) not in self.frontier_map:
-                self.visited_nodes.add(tuple(child.config))
-                self.frontier_map[tuple(child.config)] = child
+            # A move changes a single tile, so a child's cost is derived
+            # from its parent's instead of rescoring the whole board
+            child.h = self.heuristic.update(parent.h, parent.key, child.key,
+                                            parent.blank_index,
+                                            child.blank_index)
+
+            if child.key not in self.visited_nodes and \
+                    child.key not in self.frontier_map:
+                self._mark_visited(child)
+                self.frontier_map[child.key] = child.cost
                 _cost = self._get_total_cost(child)
-                self.frontier.push(child, _cost)
+                self.frontier.push(child, _cost, tie_breaker=child.cost,
+                                   state_key=child.key)
                 self.max_search_depth = max(self.max_search_depth,
                                             child.cost)
 
-            elif tuple(child.config) in self.frontier_map:
-                current_cost = self._get_total_cost(child)
-                _child_state = self.frontier_map.get(tuple(child.config))
-                previous_cost = self._get_total_cost(_child_state)
-                if current_cost < previous_cost:
-                    self.frontier.push(child, current_cost)
-
-            _ram_usage = getrusage(RUSAGE_SELF).ru_maxrss
-            current_ram_usage = _ram_usage - self.start_ram_usage
-            self.max_ram_usage = max(self.max_ram_usage, current_ram_usage)
+            elif child.key in self.frontier_map:
+                # Same board, same h: only the path costs need comparing
+                if child.cost < self.frontier_map[child.key]:
+                    # Replaces the queued entry for this board
+                    self.frontier_map[child.key] = child.cost
+                    if self.predecessors is not None:
+                        self.predecessors.add(child.key, child.action)
+                    self.frontier.push(child, self._get_total_cost(child),
+                                       tie_breaker=child.cost,
+                                       state_key=child.key)
+                else:
+                    instrumentation.duplicates += 1
+        instrumentation.expanded(len(self.frontier))
+
+    def _mark_visited(self, state):
+        if self.predecessors is None:
+            self.visited_nodes.add(state.key)
+        else:
+            self.predecessors.add(state.key, state.action)
 
     def is_goal(self):
-        return self.current_state.config == self.goal_state
+        return self.current_state.key == self.goal_key
 
     def _path_to_goal(self, display=False):
+        if self.predecessors is not None:
+            return self._recorded_path_to_goal(display=display)
+
         actions_to_goal = [self.current_state.action]
         path_to_goal = [self.current_state]
         parent_node = self.current_state.parent
@@ -115,10 +120,26 @@ class AStar:
         actions_to_goal.reverse()
         return actions_to_goal
 
+    def _recorded_path_to_goal(self, display=False):
+        actions_to_goal = self.predecessors.path_to(
+            self.current_state.key, self.current_state.blank_index)
+
+        if display:
+            state = self.initial_state
+            print("Game Path: \n")
+            for action in actions_to_goal:
+                state = getattr(state, 'move_' + action.lower())()
+                state.display()
+                print("\n")
+
+        return actions_to_goal
+
     def search(self, display_path=False):
 
+        self.instrumentation.start()
         initial_cost = self._get_total_cost(self.initial_state)
-        self.frontier.push(self.current_state, initial_cost)
+        self.frontier.push(self.current_state, initial_cost,
+                           state_key=self.current_state.key)
 
         goal_found = False
         search_depth = 0
@@ -126,12 +147,14 @@ class AStar:
         while not self.frontier.empty():
             cost, order, state = self.frontier.pop()
             self.current_state = state
-            self.visited_nodes.add(tuple(self.current_state.config))
+            if self.predecessors is None:
+                self.visited_nodes.add(self.current_state.key)
             if self.is_goal():
                 search_depth = self.current_state.cost
                 goal_found = True
                 break
             self._expand_current_node()
+        self.instrumentation.stop()
         self.frontier.clear()
         path_to_goal = self._path_to_goal(display=display_path)
 
@@ -142,7 +165,7 @@ class AStar:
                 self.nodes_expanded-1, search_depth)
 
     def get_max_ram_usage(self):
-        return self.max_ram_usage
+        return self.instrumentation.peak_memory
 
     def get_max_search_depth(self):
         return self.max_search_depth
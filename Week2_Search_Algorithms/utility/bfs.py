@@ -6,11 +6,15 @@ from utility.uninformed_search import UninformedSearch
 
 class BFS(UninformedSearch):
 
-    def __init__(self, initial_state, goal_state, start_ram_usage=0):
-        super().__init__(initial_state, goal_state, start_ram_usage)
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 instrumentation=None, record_moves=False):
+        super().__init__(initial_state, goal_state, start_ram_usage,
+                         instrumentation=instrumentation,
+                         record_moves=record_moves)
 
     def search(self, display_path=False):
 
+        self.instrumentation.start()
         search_depth = 0
         goal_found = False
 
@@ -22,6 +26,7 @@ class BFS(UninformedSearch):
                 goal_found = True
                 break
             self._expand_current_node(current_depth=current_depth)
+        self.instrumentation.stop()
         self.unexplored_nodes.clear()  # Empty the Queue
         path_to_goal = self._path_to_goal(display=display_path)
 
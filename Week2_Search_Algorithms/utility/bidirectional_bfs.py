@@ -0,0 +1,146 @@
+"""
+    Bidirectional Breadth First Search
+"""
+
+from utility.packed_board import (pack, move_table, print_path, REVERSE_MOVE,
+                                  TILE_BITS, TILE_MASK)
+from utility.instrumentation import Instrumentation
+
+(FORWARD, BACKWARD) = (0, 1)
+
+
+class BidirectionalBFS:
+
+    """
+        Grows one BFS layer at a time from the start and from the goal,
+        always expanding the smaller frontier, until a board reached from one
+        side is generated by the other. Both sides share one visited index
+        mapping each packed board to its side, depth and the neighbouring
+        board towards that side's root.
+    """
+
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth',
+                 'visited_nodes', 'instrumentation')
+
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 instrumentation=None):
+        self.initial_state = initial_state
+        self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
+        self.start_ram_usage = start_ram_usage
+        self.nodes_expanded = 0
+        self.max_search_depth = 0
+        # key -> (side, depth, neighbouring key, action to that neighbour)
+        self.visited_nodes = dict()
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
+
+    def _expand_layer(self, layer, side, depth, moves):
+        """
+            Expands a whole layer, returning the next layer and the cheapest
+            (path cost, key, neighbour, action) meeting with the other side
+        """
+        visited = self.visited_nodes
+        instrumentation = self.instrumentation
+        next_layer = []
+        meeting = None
+
+        for key, blank in layer:
+            self.nodes_expanded += 1
+            instrumentation.expanded(len(layer) + len(next_layer))
+            instrumentation.generations += len(moves[blank])
+            for action, target in moves[blank]:
+                tile = (key >> (target * TILE_BITS)) & TILE_MASK
+                child_key = (key
+                             + (tile << (blank * TILE_BITS))
+                             - (tile << (target * TILE_BITS)))
+                seen = visited.get(child_key)
+                if seen is None:
+                    # Backward boards record the move that leads to the goal
+                    visited[child_key] = (side, depth + 1, key,
+                                          REVERSE_MOVE[action]
+                                          if side == BACKWARD else action)
+                    next_layer.append((child_key, target))
+                elif seen[0] != side:
+                    cost = depth + 1 + seen[1]
+                    if meeting is None or cost < meeting[0]:
+                        meeting = (cost, child_key, key, action)
+                else:
+                    instrumentation.duplicates += 1
+        return next_layer, meeting
+
+    def _path_to_goal(self, meeting_key, neighbour_key, action, side):
+        visited = self.visited_nodes
+
+        # Split the meeting edge into its forward and backward halves
+        if side == FORWARD:
+            (forward_key, backward_key) = (neighbour_key, meeting_key)
+        else:
+            (forward_key, backward_key) = (meeting_key, neighbour_key)
+            action = REVERSE_MOVE[action]
+
+        forward_actions = []
+        _side, _depth, parent_key, parent_action = visited[forward_key]
+        while parent_action is not None:
+            forward_actions.append(parent_action)
+            _side, _depth, parent_key, parent_action = visited[parent_key]
+        forward_actions.reverse()
+
+        backward_actions = []
+        _side, _depth, next_key, next_action = visited[backward_key]
+        while next_action is not None:
+            backward_actions.append(next_action)
+            _side, _depth, next_key, next_action = visited[next_key]
+
+        return forward_actions + [action] + backward_actions
+
+    def search(self, display_path=False):
+
+        moves = move_table(self.initial_state.n)
+        start_key = self.initial_state.key
+        goal_key = self.goal_key
+
+        if start_key == goal_key:
+            return (True, [], 0, 0, 0)
+
+        self.instrumentation.start()
+        self.visited_nodes[start_key] = (FORWARD, 0, None, None)
+        self.visited_nodes[goal_key] = (BACKWARD, 0, None, None)
+        layers = [[(start_key, self.initial_state.blank_index)],
+                  [(goal_key, self.goal_state.index(0))]]
+        depths = [0, 0]
+
+        path_to_goal = None
+        while layers[FORWARD] and layers[BACKWARD]:
+            side = (FORWARD if len(layers[FORWARD]) <= len(layers[BACKWARD])
+                    else BACKWARD)
+            next_layer, meeting = self._expand_layer(layers[side], side,
+                                                     depths[side], moves)
+            layers[side] = next_layer
+            depths[side] += 1
+            self.max_search_depth = max(self.max_search_depth, depths[side])
+
+            if meeting is not None:
+                _cost, meeting_key, neighbour_key, action = meeting
+                path_to_goal = self._path_to_goal(meeting_key, neighbour_key,
+                                                  action, side)
+                break
+
+        self.instrumentation.stop()
+        self.visited_nodes.clear()
+
+        if path_to_goal is None:
+            return (False, [], 0, self.nodes_expanded, 0)
+
+        if display_path:
+            print_path(self.initial_state, path_to_goal)
+
+        return (True, path_to_goal, len(path_to_goal),
+                self.nodes_expanded, len(path_to_goal))
+
+    def get_max_ram_usage(self):
+        return self.instrumentation.peak_memory
+
+    def get_max_search_depth(self):
+        return self.max_search_depth
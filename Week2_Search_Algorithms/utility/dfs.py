@@ -6,11 +6,15 @@ from utility.uninformed_search import UninformedSearch
 
 
 class DFS(UninformedSearch):
-    def __init__(self, initial_state, goal_state, start_ram_usage):
-        super().__init__(initial_state, goal_state, start_ram_usage)
+    def __init__(self, initial_state, goal_state, start_ram_usage,
+                 instrumentation=None, record_moves=False):
+        super().__init__(initial_state, goal_state, start_ram_usage,
+                         instrumentation=instrumentation,
+                         record_moves=record_moves)
 
     def search(self, display_path=False):
 
+        self.instrumentation.start()
         visited_nodes = set()
         search_depth = 0
         goal_found = False
@@ -22,9 +26,10 @@ class DFS(UninformedSearch):
                 search_depth = current_depth
                 goal_found = True
                 break
-            visited_nodes.add(self.current_state.config)
+            visited_nodes.add(self.current_state.key)
             self._expand_current_node(current_depth=current_depth,
                                       reversed=True)
+        self.instrumentation.stop()
         self.unexplored_nodes.clear()
         path_to_goal = self._path_to_goal(display=display_path)
 
@@ -0,0 +1,297 @@
+"""
+    Heuristics for the informed searches, selectable by name
+
+    Every heuristic scores a packed board key, and can rescore a child board
+    from its parent's score when the tile at target slides into the blank.
+"""
+
+import os
+from collections import deque
+
+from utility.packed_board import manhattan_table, TILE_BITS, TILE_MASK
+from utility.pattern_database import AdditivePatternDatabase, default_path
+
+
+class Heuristic:
+
+    __slots__ = ('goal_state', 'n')
+
+    name = None
+
+    def __init__(self, goal_state, n):
+        self.goal_state = tuple(goal_state)
+        self.n = n
+
+    def cost(self, key):
+        raise NotImplementedError("{}".format(self.name))
+
+    def update(self, h, key, child_key, blank, target):
+        """
+            Cost of child_key, reached from key by sliding the tile at target
+            into the blank
+        """
+        return self.cost(child_key)
+
+
+class MisplacedTiles(Heuristic):
+
+    __slots__ = ('goal_positions',)
+
+    name = 'misplaced'
+
+    def __init__(self, goal_state, n):
+        super().__init__(goal_state, n)
+        self.goal_positions = tuple(self.goal_state.index(tile)
+                                    for tile in range(n * n))
+
+    def cost(self, key):
+        goal_positions = self.goal_positions
+        misplaced = 0
+        for idx in range(self.n * self.n):
+            tile = (key >> (idx * TILE_BITS)) & TILE_MASK
+            if tile and goal_positions[tile] != idx:
+                misplaced += 1
+        return misplaced
+
+    def update(self, h, key, child_key, blank, target):
+        tile = (key >> (target * TILE_BITS)) & TILE_MASK
+        goal_position = self.goal_positions[tile]
+        return h + (goal_position == target) - (goal_position == blank)
+
+
+class ManhattanDistance(Heuristic):
+
+    __slots__ = ('distances',)
+
+    name = 'manhattan'
+
+    def __init__(self, goal_state, n):
+        super().__init__(goal_state, n)
+        self.distances = manhattan_table(self.goal_state, n)
+
+    def cost(self, key):
+        distances = self.distances
+        return sum(distances[(key >> (idx * TILE_BITS)) & TILE_MASK][idx]
+                   for idx in range(self.n * self.n))
+
+    def update(self, h, key, child_key, blank, target):
+        tile = (key >> (target * TILE_BITS)) & TILE_MASK
+        distances = self.distances[tile]
+        return h + distances[blank] - distances[target]
+
+
+class LinearConflict(ManhattanDistance):
+
+    """
+        Manhattan distance plus two moves for every tile that must leave its
+        goal row or column to let another tile in the same line past. The
+        tiles to move aside are counted as the line's tiles outside a longest
+        run already in goal order, which keeps the bound admissible.
+    """
+
+    __slots__ = ('lines', 'line_of', 'goal_lines', '_conflicts')
+
+    name = 'linear'
+
+    def __init__(self, goal_state, n):
+        super().__init__(goal_state, n)
+        rows = [tuple(range(row * n, row * n + n)) for row in range(n)]
+        cols = [tuple(range(col, n * n, n)) for col in range(n)]
+        self.lines = tuple(rows + cols)
+        # Index of the row and of the column line through each position
+        self.line_of = tuple((idx // n, n + idx % n) for idx in range(n * n))
+        # For every line, each tile's place along it in the goal, or None
+        # when the tile's goal lies outside the line
+        self.goal_lines = []
+        for line in self.lines:
+            places = [None] * (n * n)
+            for place, idx in enumerate(line):
+                tile = self.goal_state[idx]
+                if tile:
+                    places[tile] = place
+            self.goal_lines.append(tuple(places))
+        self._conflicts = dict()
+
+    def _line_conflicts(self, key, line_index):
+        places = self.goal_lines[line_index]
+        sequence = []
+        for idx in self.lines[line_index]:
+            place = places[(key >> (idx * TILE_BITS)) & TILE_MASK]
+            if place is not None:
+                sequence.append(place)
+        sequence = tuple(sequence)
+
+        conflicts = self._conflicts.get(sequence)
+        if conflicts is None:
+            # Longest increasing run, quadratic is plenty for n <= 4
+            longest = [1] * len(sequence)
+            for i in range(len(sequence)):
+                for j in range(i):
+                    if sequence[j] < sequence[i]:
+                        longest[i] = max(longest[i], longest[j] + 1)
+            conflicts = len(sequence) - max(longest, default=0)
+            self._conflicts[sequence] = conflicts
+        return conflicts
+
+    def cost(self, key):
+        return super().cost(key) + 2 * sum(
+            self._line_conflicts(key, line_index)
+            for line_index in range(len(self.lines)))
+
+    def update(self, h, key, child_key, blank, target):
+        # Only the lines through the two swapped positions change
+        h = super().update(h, key, child_key, blank, target)
+        for line_index in set(self.line_of[blank] + self.line_of[target]):
+            h += 2 * (self._line_conflicts(child_key, line_index)
+                      - self._line_conflicts(key, line_index))
+        return h
+
+
+def _walking_table(n, blank_line):
+    """
+        Moves needed to restore every arrangement reachable from the goal,
+        where an arrangement only records how many tiles of each goal line
+        sit in each line, and which line holds the blank
+    """
+    goal = tuple(tuple((n - (line == blank_line)) if line == goal_line
+                       else 0 for goal_line in range(n))
+                 for line in range(n))
+    distances = {(goal, blank_line): 0}
+    frontier = deque([(goal, blank_line)])
+    while frontier:
+        state = frontier.popleft()
+        counts, blank = state
+        for line in (blank - 1, blank + 1):
+            if not 0 <= line < n:
+                continue
+            for goal_line in range(n):
+                if not counts[line][goal_line]:
+                    continue
+                # A tile of goal_line slides from line into the blank's line
+                moved = [list(row) for row in counts]
+                moved[line][goal_line] -= 1
+                moved[blank][goal_line] += 1
+                child = (tuple(tuple(row) for row in moved), line)
+                if child not in distances:
+                    distances[child] = distances[state] + 1
+                    frontier.append(child)
+    return distances
+
+
+class WalkingDistance(Heuristic):
+
+    """
+        Walking distance: the vertical part counts the moves needed if tiles
+        only had to reach their goal rows, and a tile could only ever swap
+        with the blank; the horizontal part does the same for columns. Both
+        parts are read from a table built by a BFS over these arrangements.
+        A horizontal move never changes the vertical part and vice versa.
+    """
+
+    __slots__ = ('axes', 'tables', '_line_counts')
+
+    name = 'walking'
+
+    def __init__(self, goal_state, n):
+        super().__init__(goal_state, n)
+        blank_goal = self.goal_state.index(0)
+        rows = tuple(tuple(range(row * n, row * n + n)) for row in range(n))
+        cols = tuple(tuple(range(col, n * n, n)) for col in range(n))
+        goal_rows = [0] * (n * n)
+        goal_cols = [0] * (n * n)
+        for idx, tile in enumerate(self.goal_state):
+            goal_rows[tile], goal_cols[tile] = divmod(idx, n)
+        # (lines of positions, goal line of every tile) per axis
+        self.axes = ((rows, tuple(goal_rows)), (cols, tuple(goal_cols)))
+        self.tables = (_walking_table(n, blank_goal // n),
+                       _walking_table(n, blank_goal % n))
+        self._line_counts = dict()
+
+    def _axis_cost(self, key, axis):
+        lines, goal_lines = self.axes[axis]
+        n = self.n
+        counts = []
+        blank_line = None
+        for line, positions in enumerate(lines):
+            tiles = tuple((key >> (idx * TILE_BITS)) & TILE_MASK
+                          for idx in positions)
+            line_counts = self._line_counts.get((axis, tiles))
+            if line_counts is None:
+                per_goal_line = [0] * n
+                for tile in tiles:
+                    if tile:
+                        per_goal_line[goal_lines[tile]] += 1
+                line_counts = tuple(per_goal_line)
+                self._line_counts[(axis, tiles)] = line_counts
+            counts.append(line_counts)
+            if 0 in tiles:
+                blank_line = line
+        return self.tables[axis][(tuple(counts), blank_line)]
+
+    def cost(self, key):
+        return self._axis_cost(key, 0) + self._axis_cost(key, 1)
+
+    def update(self, h, key, child_key, blank, target):
+        # Vertical moves change the row part, horizontal ones the column part
+        axis = 0 if abs(target - blank) == self.n else 1
+        return (h - self._axis_cost(key, axis)
+                + self._axis_cost(child_key, axis))
+
+
+class PatternDatabaseHeuristic(Heuristic):
+
+    """
+        Additive disjoint pattern databases, mmapped from the file built by
+        utility.pattern_database
+    """
+
+    __slots__ = ('database',)
+
+    name = 'pdb'
+
+    def __init__(self, goal_state, n, path=None):
+        super().__init__(goal_state, n)
+        path = path or default_path(n)
+        if not os.path.exists(path):
+            raise Exception(f"No pattern database at {path}, build it with "
+                            f"'python -m utility.pattern_database {n}'")
+        self.database = AdditivePatternDatabase.load(path)
+        if self.database.goal_state != self.goal_state:
+            raise Exception(f"{path} was built for another goal state!")
+
+    def cost(self, key):
+        return self.database.cost(key)
+
+    def update(self, h, key, child_key, blank, target):
+        # Only the pattern holding the moved tile changes
+        tile = (key >> (target * TILE_BITS)) & TILE_MASK
+        database = self.database.tile_database.get(tile)
+        if database is None:
+            return h
+        return h - database.cost(key) + database.cost(child_key)
+
+
+HEURISTICS = dict((heuristic.name, heuristic)
+                  for heuristic in (MisplacedTiles,
+                                    ManhattanDistance,
+                                    LinearConflict,
+                                    WalkingDistance,
+                                    PatternDatabaseHeuristic))
+
+
+# Heuristics hold no per-search state, so one instance per process is reused
+# and its tables stay warm across searches
+_heuristic_cache = dict()
+
+
+def get_heuristic(name, goal_state, n, **options):
+    if name not in HEURISTICS:
+        raise Exception(f"Unknown heuristic '{name}', choose one of "
+                        f"{', '.join(sorted(HEURISTICS))}")
+
+    cache_key = (name, tuple(goal_state), n, tuple(sorted(options.items())))
+    heuristic = _heuristic_cache.get(cache_key)
+    if heuristic is None:
+        heuristic = HEURISTICS[name](goal_state, n, **options)
+        _heuristic_cache[cache_key] = heuristic
+    return heuristic
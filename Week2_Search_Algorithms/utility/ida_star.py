@@ -0,0 +1,138 @@
+"""
+    Iterative Deepening A* Search
+"""
+
+from utility.packed_board import (pack, move_table, is_solvable,
+                                  print_path, REVERSE_MOVE, TILE_BITS,
+                                  TILE_MASK)
+from utility.heuristics import get_heuristic
+from utility.instrumentation import Instrumentation
+
+_FOUND = -1
+
+
+class IDAStar:
+
+    """
+        Depth-first searches bounded by f = g + h, raising the bound to the
+        smallest f that exceeded it until the goal is reached. Only the
+        current path is kept in memory, and boards are walked as packed ints
+        so generating a move allocates no PuzzleState.
+    """
+
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth',
+                 'path', 'heuristic', 'instrumentation')
+
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 heuristic='manhattan', instrumentation=None):
+        self.initial_state = initial_state
+        self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
+        self.start_ram_usage = start_ram_usage
+        self.nodes_expanded = 0
+        self.max_search_depth = 0
+        self.path = []
+        self.heuristic = get_heuristic(heuristic, goal_state, initial_state.n)
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
+
+    def _bounded_search(self, bound, moves):
+        """
+            Runs one depth-first pass below bound, leaving the actions to the
+            goal in self.path. Returns _FOUND or the smallest f above bound.
+            Counters are kept in locals and handed to the instrumentation
+            once the pass is over.
+        """
+        goal_key = self.goal_key
+        update = self.heuristic.update
+        path = self.path
+        nodes_expanded = 0
+        nodes_generated = 0
+        max_search_depth = self.max_search_depth
+
+        def _search(key, blank, g, h, previous):
+            nonlocal nodes_expanded, nodes_generated, max_search_depth
+
+            f = g + h
+            if f > bound:
+                return f
+            if key == goal_key:
+                return _FOUND
+
+            nodes_expanded += 1
+            if g + 1 > max_search_depth:
+                max_search_depth = g + 1
+
+            minimum = float('Inf')
+            for action, target in moves[blank]:
+                if action == previous:
+                    continue
+                tile = (key >> (target * TILE_BITS)) & TILE_MASK
+                child_key = (key
+                             + (tile << (blank * TILE_BITS))
+                             - (tile << (target * TILE_BITS)))
+                child_h = update(h, key, child_key, blank, target)
+                nodes_generated += 1
+                path.append(action)
+                result = _search(child_key, target, g + 1, child_h,
+                                 REVERSE_MOVE[action])
+                if result == _FOUND:
+                    return _FOUND
+                path.pop()
+                if result < minimum:
+                    minimum = result
+            return minimum
+
+        state = self.initial_state
+        h = self.heuristic.cost(state.key)
+        result = _search(state.key, state.blank_index, 0, h, None)
+
+        self.nodes_expanded += nodes_expanded
+        self.max_search_depth = max_search_depth
+        instrumentation = self.instrumentation
+        instrumentation.expansions += nodes_expanded
+        instrumentation.generations += nodes_generated
+        # The only frontier is the current path
+        instrumentation.max_frontier_size = max_search_depth
+        instrumentation.sampler.sample()
+        return result
+
+    def search(self, display_path=False):
+
+        n = self.initial_state.n
+        moves = move_table(n)
+
+        # The bound would grow forever on a board that cannot be solved
+        if not is_solvable(self.initial_state.config, n, self.goal_state):
+            return (False, [], 0, 0, 0)
+
+        self.instrumentation.start()
+        goal_found = False
+        # No path can cost less than the root's own estimate
+        bound = self.heuristic.cost(self.initial_state.key)
+        while True:
+            result = self._bounded_search(bound, moves)
+            if result == _FOUND:
+                goal_found = True
+                break
+            if result == float('Inf'):
+                break
+            bound = result
+        self.instrumentation.stop()
+
+        if not goal_found:
+            return (False, [], 0, self.nodes_expanded, 0)
+
+        if display_path:
+            print_path(self.initial_state, self.path)
+
+        path_to_goal = list(self.path)
+        return (True, path_to_goal, len(path_to_goal),
+                self.nodes_expanded, len(path_to_goal))
+
+    def get_max_ram_usage(self):
+        return self.instrumentation.peak_memory
+
+    def get_max_search_depth(self):
+        return self.max_search_depth
@@ -0,0 +1,165 @@
+"""
+    Iterative Deepening Depth First Search
+"""
+
+from utility.packed_board import (pack, move_table, is_solvable, print_path,
+                                  REVERSE_MOVE, TILE_BITS)
+from utility.instrumentation import Instrumentation
+
+
+def _successors(moves, blank, previous):
+    """
+        Moves out of blank, except the one undoing the previous move
+    """
+    undo = REVERSE_MOVE.get(previous)
+    for action, target in moves[blank]:
+        if action != undo:
+            yield action, target
+
+
+class IDDFS:
+
+    """
+        Depth limited DFS passes with a growing limit, so the first goal
+        found is at the optimal depth. A pass walks one mutable board with
+        make/unmake moves, driven by a stack of successor generators, and
+        only rejects boards already on the current path. Memory therefore
+        stays proportional to the depth instead of the boards seen.
+    """
+
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth', 'max_depth',
+                 'board', 'blank', 'key', 'path', 'instrumentation')
+
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 instrumentation=None, max_depth=None):
+        self.initial_state = initial_state
+        self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
+        self.start_ram_usage = start_ram_usage
+        self.nodes_expanded = 0
+        self.max_search_depth = 0
+        self.max_depth = max_depth
+        self.board = bytearray(initial_state.config)
+        self.blank = initial_state.blank_index
+        self.key = initial_state.key
+        self.path = []
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
+
+    def _make(self, target):
+        """
+            Slides the tile at target into the blank, returning the old blank
+        """
+        board = self.board
+        blank = self.blank
+        tile = board[target]
+        board[blank] = tile
+        board[target] = 0
+        self.key += ((tile << (blank * TILE_BITS))
+                     - (tile << (target * TILE_BITS)))
+        self.blank = target
+        return blank
+
+    def _unmake(self, previous_blank):
+        self._make(previous_blank)
+
+    def _limited_search(self, limit, moves):
+        """
+            One depth limited pass, leaving the actions to the goal in
+            self.path. Returns True once the goal is found.
+        """
+        goal_key = self.goal_key
+        path = self.path
+        on_path = {self.key}
+        # One successor generator per board on the path, and the blank each
+        # move came from, so it can be undone
+        generators = [_successors(moves, self.blank, None)]
+        previous_blanks = []
+        nodes_expanded = 1 if limit else 0
+        nodes_generated = 0
+        cycles = 0
+        max_search_depth = self.max_search_depth
+
+        if self.key == goal_key:
+            return True
+        if not limit:
+            return False
+
+        while generators:
+            for action, target in generators[-1]:
+                previous_blank = self._make(target)
+                nodes_generated += 1
+                if self.key in on_path:
+                    cycles += 1
+                    self._unmake(previous_blank)
+                    continue
+
+                path.append(action)
+                if len(path) > max_search_depth:
+                    max_search_depth = len(path)
+                if self.key == goal_key:
+                    generators.clear()
+                    break
+                if len(path) < limit:
+                    # Descend: the new board's moves are tried next
+                    on_path.add(self.key)
+                    previous_blanks.append(previous_blank)
+                    generators.append(_successors(moves, self.blank, action))
+                    nodes_expanded += 1
+                    break
+                path.pop()
+                self._unmake(previous_blank)
+            else:
+                # Every move from this board is tried, back up one level
+                generators.pop()
+                if previous_blanks:
+                    on_path.discard(self.key)
+                    path.pop()
+                    self._unmake(previous_blanks.pop())
+
+        self.nodes_expanded += nodes_expanded
+        self.max_search_depth = max_search_depth
+        instrumentation = self.instrumentation
+        instrumentation.expansions += nodes_expanded
+        instrumentation.generations += nodes_generated
+        instrumentation.duplicates += cycles
+        # The only frontier is the current path
+        instrumentation.max_frontier_size = max_search_depth
+        instrumentation.sampler.sample()
+        return self.key == goal_key
+
+    def search(self, display_path=False):
+
+        n = self.initial_state.n
+        moves = move_table(n)
+
+        # No depth limit would ever reach the goal
+        if not is_solvable(self.initial_state.config, n, self.goal_state):
+            return (False, [], 0, 0, 0)
+
+        self.instrumentation.start()
+        goal_found = False
+        limit = 0
+        while self.max_depth is None or limit <= self.max_depth:
+            if self._limited_search(limit, moves):
+                goal_found = True
+                break
+            limit += 1
+        self.instrumentation.stop()
+
+        if not goal_found:
+            return (False, [], 0, self.nodes_expanded, 0)
+
+        if display_path:
+            print_path(self.initial_state, self.path)
+
+        path_to_goal = list(self.path)
+        return (True, path_to_goal, len(path_to_goal),
+                self.nodes_expanded, len(path_to_goal))
+
+    def get_max_ram_usage(self):
+        return self.instrumentation.peak_memory
+
+    def get_max_search_depth(self):
+        return self.max_search_depth
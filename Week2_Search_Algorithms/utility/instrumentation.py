@@ -0,0 +1,152 @@
+"""
+    Search Instrumentation
+
+    Searches bump a few plain counters inline and leave memory measurement to
+    a sampler that runs every sample_interval expansions, or on a background
+    thread every sample_period seconds, instead of once per generated node.
+"""
+
+import json
+import threading
+import time
+import tracemalloc
+from resource import getrusage, RUSAGE_SELF
+
+
+class RusageSampler:
+
+    """
+        Process-wide ru_maxrss high-water mark above the baseline, in KB
+    """
+
+    __slots__ = ('baseline', 'peak')
+
+    def __init__(self, baseline=None):
+        self.baseline = baseline
+        self.peak = 0
+
+    def start(self):
+        if self.baseline is None:
+            self.baseline = getrusage(RUSAGE_SELF).ru_maxrss
+
+    def sample(self):
+        usage = getrusage(RUSAGE_SELF).ru_maxrss - self.baseline
+        if usage > self.peak:
+            self.peak = usage
+
+    def stop(self):
+        self.sample()
+
+
+class TracemallocSampler:
+
+    """
+        Peak Python heap allocated while the search ran, in KB. Tracing slows
+        allocation down, so prefer rusage for timing runs.
+    """
+
+    __slots__ = ('peak', '_started')
+
+    def __init__(self):
+        self.peak = 0
+        self._started = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        tracemalloc.reset_peak()
+
+    def sample(self):
+        _current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak // 1024)
+
+    def stop(self):
+        self.sample()
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+
+MEMORY_SAMPLERS = {
+    'rusage': RusageSampler,
+    'tracemalloc': TracemallocSampler
+}
+
+
+class Instrumentation:
+
+    __slots__ = ('expansions', 'generations', 'duplicates',
+                 'max_frontier_size', 'sampler', 'sample_interval',
+                 'sample_period', 'start_time', 'running_time', '_countdown',
+                 '_thread', '_stop_event')
+
+    def __init__(self, memory='rusage', sample_interval=1000,
+                 sample_period=None, start_ram_usage=None):
+        self.expansions = 0
+        self.generations = 0
+        self.duplicates = 0
+        self.max_frontier_size = 0
+        if memory == 'rusage':
+            self.sampler = RusageSampler(baseline=start_ram_usage)
+        else:
+            self.sampler = MEMORY_SAMPLERS[memory]()
+        # A background thread replaces inline sampling
+        self.sample_interval = 0 if sample_period else sample_interval
+        self.sample_period = sample_period
+        self.start_time = None
+        self.running_time = 0
+        self._countdown = self.sample_interval
+        self._thread = None
+        self._stop_event = None
+
+    def start(self):
+        self.sampler.start()
+        self.start_time = time.time()
+        if self.sample_period:
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._sample_periodically,
+                                            daemon=True)
+            self._thread.start()
+
+    def _sample_periodically(self):
+        while not self._stop_event.wait(self.sample_period):
+            self.sampler.sample()
+
+    def expanded(self, frontier_size):
+        """
+            Called once per expanded node
+        """
+        self.expansions += 1
+        if frontier_size > self.max_frontier_size:
+            self.max_frontier_size = frontier_size
+        if self.sample_interval:
+            self._countdown -= 1
+            if self._countdown <= 0:
+                self._countdown = self.sample_interval
+                self.sampler.sample()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.sampler.stop()
+        if self.start_time is not None:
+            self.running_time = time.time() - self.start_time
+
+    @property
+    def peak_memory(self):
+        return self.sampler.peak
+
+    def as_dict(self):
+        return dict(expansions=self.expansions,
+                    generations=self.generations,
+                    duplicates=self.duplicates,
+                    max_frontier_size=self.max_frontier_size,
+                    peak_memory_kb=self.peak_memory,
+                    running_time=self.running_time)
+
+    def dump_json(self, path, **extra):
+        with open(path, 'w') as json_file:
+            json.dump(dict(self.as_dict(), **extra), json_file, indent=2)
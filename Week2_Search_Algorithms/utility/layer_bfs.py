@@ -0,0 +1,191 @@
+"""
+    Layer Synchronous Breadth First Search
+
+    Holds each BFS layer as a NumPy array of packed uint64 boards and builds
+    the next layer with a handful of array operations: every legal move of
+    every board is made at once with shifts and masks, and the children are
+    deduplicated with np.unique and np.isin. Moves are reversible, so a child
+    can only repeat a board from the current or the previous layer.
+
+    Layers keep the order in which FIFO BFS would discover their boards, so
+    the path found is the one BFS finds.
+
+        python -m utility.layer_bfs 3
+"""
+
+import sys
+
+import numpy as np
+
+from utility.packed_board import (pack, goal_config, is_solvable, print_path,
+                                  MOVE_ORDER, TILE_BITS, TILE_MASK)
+from utility.instrumentation import Instrumentation
+
+_NO_BOARDS = np.zeros(0, dtype=np.uint64)
+
+
+def _successors(keys, blanks, n, order=MOVE_ORDER):
+    """
+        Children of a layer, grouped by parent and then by move order, as
+        (keys, blanks, parent indices, action codes)
+    """
+    rows = blanks // n
+    cols = blanks % n
+    legal = {'Up': (rows > 0, -n),
+             'Down': (rows < n - 1, n),
+             'Left': (cols > 0, -1),
+             'Right': (cols < n - 1, 1)}
+
+    size = len(keys)
+    child_keys = np.zeros((size, len(order)), dtype=np.uint64)
+    child_blanks = np.zeros((size, len(order)), dtype=np.int8)
+    valid = np.zeros((size, len(order)), dtype=bool)
+    blank_shifts = blanks.astype(np.uint64) * np.uint64(TILE_BITS)
+    for code, action in enumerate(order):
+        ok, offset = legal[action]
+        # Illegal moves slide the blank onto itself and are masked out below
+        targets = np.where(ok, blanks + offset, blanks)
+        target_shifts = targets.astype(np.uint64) * np.uint64(TILE_BITS)
+        tiles = (keys >> target_shifts) & np.uint64(TILE_MASK)
+        child_keys[:, code] = (keys
+                               + (tiles << blank_shifts)
+                               - (tiles << target_shifts))
+        child_blanks[:, code] = targets
+        valid[:, code] = ok
+
+    parents = np.repeat(np.arange(size, dtype=np.int32), len(order))
+    codes = np.tile(np.arange(len(order), dtype=np.uint8), size)
+    valid = valid.ravel()
+    return (child_keys.ravel()[valid], child_blanks.ravel()[valid],
+            parents[valid], codes[valid])
+
+
+def _next_layer(keys, blanks, previous_keys, n):
+    """
+        The boards first reached from keys, in FIFO discovery order, with the
+        number of children generated and of duplicates dropped
+    """
+    (child_keys, child_blanks,
+     parents, codes) = _successors(keys, blanks, n)
+    _unique, first = np.unique(child_keys, return_index=True)
+    first.sort()
+    seen = np.isin(child_keys[first], np.concatenate((previous_keys, keys)))
+    keep = first[~seen]
+    return (child_keys[keep], child_blanks[keep], parents[keep], codes[keep],
+            len(child_keys), len(child_keys) - len(keep))
+
+
+class LayerBFS:
+
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth', 'instrumentation')
+
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 instrumentation=None):
+        self.initial_state = initial_state
+        self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
+        self.start_ram_usage = start_ram_usage
+        self.nodes_expanded = 0
+        self.max_search_depth = 0
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
+
+    def _path_to_goal(self, layers, index):
+        actions = []
+        for _keys, parents, codes in reversed(layers[1:]):
+            actions.append(MOVE_ORDER[codes[index]])
+            index = parents[index]
+        actions.reverse()
+        return actions
+
+    def search(self, display_path=False):
+
+        n = self.initial_state.n
+        if self.initial_state.key == self.goal_key:
+            return (True, [], 0, 0, 0)
+        if not is_solvable(self.initial_state.config, n, self.goal_state):
+            return (False, [], 0, 0, 0)
+
+        self.instrumentation.start()
+        instrumentation = self.instrumentation
+        goal_key = np.uint64(self.goal_key)
+        keys = np.array([self.initial_state.key], dtype=np.uint64)
+        blanks = np.array([self.initial_state.blank_index], dtype=np.int8)
+        previous_keys = _NO_BOARDS
+        # Per layer: boards, index of each board's parent, move reaching it
+        layers = [(keys, None, None)]
+
+        goal_index = None
+        while len(keys):
+            (child_keys, child_blanks, parents, codes,
+             generated, duplicates) = _next_layer(keys, blanks,
+                                                  previous_keys, n)
+            layers.append((child_keys, parents, codes))
+            instrumentation.expansions += len(keys)
+            instrumentation.generations += generated
+            instrumentation.duplicates += duplicates
+            instrumentation.max_frontier_size = max(
+                instrumentation.max_frontier_size, len(child_keys))
+            instrumentation.sampler.sample()
+
+            self.nodes_expanded += len(keys)
+            (previous_keys, keys, blanks) = (keys, child_keys, child_blanks)
+
+            found = np.flatnonzero(keys == goal_key)
+            if len(found):
+                goal_index = int(found[0])
+                break
+        instrumentation.stop()
+
+        if goal_index is None:
+            return (False, [], 0, self.nodes_expanded, 0)
+
+        depth = len(layers) - 1
+        # FIFO BFS would also expand the boards queued ahead of the goal
+        self.nodes_expanded += goal_index
+        self.max_search_depth = depth + 1 if goal_index else depth
+
+        path_to_goal = self._path_to_goal(layers, goal_index)
+        if display_path:
+            print_path(self.initial_state, path_to_goal)
+
+        return (True, path_to_goal, depth, self.nodes_expanded, depth)
+
+    def get_max_ram_usage(self):
+        return self.instrumentation.peak_memory
+
+    def get_max_search_depth(self):
+        return self.max_search_depth
+
+
+def count_layers(n, goal_state=None, max_depth=None):
+    """
+        Number of boards at each distance from the goal, over the whole
+        reachable state space or down to max_depth
+    """
+    goal_state = goal_state or goal_config(n)
+    keys = np.array([pack(goal_state)], dtype=np.uint64)
+    blanks = np.array([list(goal_state).index(0)], dtype=np.int8)
+    previous_keys = _NO_BOARDS
+    counts = []
+    while len(keys) and (max_depth is None or len(counts) <= max_depth):
+        counts.append(len(keys))
+        (child_keys, child_blanks,
+         _parents, _codes, _generated, _duplicates) = _next_layer(
+            keys, blanks, previous_keys, n)
+        (previous_keys, keys, blanks) = (keys, child_keys, child_blanks)
+    return counts
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    max_depth = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    counts = count_layers(n, max_depth=max_depth)
+    for depth, count in enumerate(counts):
+        print(f"{depth:3} {count:>12}")
+    print(f"Total {sum(counts):>12}")
+
+
+if __name__ == '__main__':
+    main()
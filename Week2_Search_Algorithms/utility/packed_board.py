@@ -0,0 +1,140 @@
+"""
+    Bit-packed Sliding Puzzle Boards
+
+    A board of up to 4x4 tiles is packed into a single int using 4 bits per
+    tile, the tile at index i living in bits [4*i, 4*i + 4).
+"""
+
+TILE_BITS = 4
+TILE_MASK = 0xF
+MAX_DIMENSION = 4
+
+# Order in which PuzzleState.expand() generates children
+MOVE_ORDER = ('Up', 'Down', 'Left', 'Right')
+ALTERNATE_MOVE_ORDER = ('Up', 'Left', 'Down', 'Right')
+REVERSE_MOVE = {'Up': 'Down', 'Down': 'Up', 'Left': 'Right', 'Right': 'Left'}
+
+_move_tables = dict()
+
+
+def pack(config):
+    """
+        Packs a config tuple into a single int
+    """
+    key = 0
+    for idx, tile in enumerate(config):
+        key |= tile << (idx * TILE_BITS)
+    return key
+
+
+def unpack(key, n):
+    """
+        Unpacks a key back into a config tuple of n*n tiles
+    """
+    return tuple((key >> (idx * TILE_BITS)) & TILE_MASK
+                 for idx in range(n * n))
+
+
+def tile_at(key, idx):
+    return (key >> (idx * TILE_BITS)) & TILE_MASK
+
+
+def slide(key, blank_index, target):
+    """
+        Slides the tile at target into the blank at blank_index
+    """
+    tile = (key >> (target * TILE_BITS)) & TILE_MASK
+    return (key
+            + (tile << (blank_index * TILE_BITS))
+            - (tile << (target * TILE_BITS)))
+
+
+def blank_offsets(n):
+    """
+        How far each action moves the blank index on an n x n board
+    """
+    return {'Up': -n, 'Down': n, 'Left': -1, 'Right': 1}
+
+
+def move_table(n, order=MOVE_ORDER):
+    """
+        Returns, for every blank index, the (action, target) pairs of the
+        legal moves in the given order, target being the index of the tile
+        that slides into the blank
+    """
+    table = _move_tables.get((n, order))
+    if table is None:
+        table = []
+        for idx in range(n * n):
+            row, col = idx // n, idx % n
+            targets = {
+                'Up': idx - n if row > 0 else None,
+                'Down': idx + n if row < n - 1 else None,
+                'Left': idx - 1 if col > 0 else None,
+                'Right': idx + 1 if col < n - 1 else None
+            }
+            table.append(tuple((action, targets[action]) for action in order
+                               if targets[action] is not None))
+        table = tuple(table)
+        _move_tables[(n, order)] = table
+    return table
+
+
+def goal_config(n):
+    return tuple(range(n * n))
+
+
+def manhattan_table(goal_state, n):
+    """
+        Returns table[tile][idx], the manhattan distance of tile at idx from
+        its position in goal_state. The blank always scores 0.
+    """
+    goal_positions = dict((tile, idx) for idx, tile in enumerate(goal_state))
+    table = []
+    for tile in range(n * n):
+        goal_row, goal_col = divmod(goal_positions[tile], n)
+        table.append(tuple(
+            0 if tile == 0 else
+            abs(idx // n - goal_row) + abs(idx % n - goal_col)
+            for idx in range(n * n)))
+    return tuple(table)
+
+
+def is_solvable(config, n, goal_state=None):
+    """
+        Inversion parity test. Numbering the tiles by their order in the
+        goal, a move never changes the parity of the inversion count on odd
+        boards. On even boards a vertical move flips it together with the
+        blank's row, so the blank's row distance to the goal is added.
+    """
+    goal_state = goal_state or goal_config(n)
+    if sorted(config) != sorted(goal_state):
+        raise Exception("the tiles of config do not match the goal!")
+
+    order = dict((tile, rank) for rank, tile in
+                 enumerate(tile for tile in goal_state if tile != 0))
+    tiles = [order[tile] for tile in config if tile != 0]
+    inversions = 0
+    for i, tile in enumerate(tiles):
+        for later_tile in tiles[i + 1:]:
+            if later_tile < tile:
+                inversions += 1
+
+    if n % 2 == 1:
+        return inversions % 2 == 0
+    blank_rows = abs(list(config).index(0) // n - goal_state.index(0) // n)
+    return (inversions + blank_rows) % 2 == 0
+
+
+def print_path(initial_state, path_to_goal):
+    """
+        Prints initial_state and every board reached along path_to_goal
+    """
+    state = initial_state
+    print("Game Path: \n")
+    state.display()
+    print("\n")
+    for action in path_to_goal:
+        state = getattr(state, 'move_' + action.lower())()
+        state.display()
+        print("\n")
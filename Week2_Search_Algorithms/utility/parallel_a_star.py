@@ -0,0 +1,395 @@
+"""
+    Hash Distributed A* Search (HDA*)
+
+    Every board is owned by one worker process, picked by hashing its packed
+    key. A worker expands only the boards it owns, from its own open list, and
+    sends the children it generates to their owners in batches. Any worker
+    that generates the goal publishes the path cost as the shared incumbent,
+    and the search ends once no worker holds a board with f below it and no
+    batch is still in flight.
+
+    Workers only expand boards with f up to a shared bound. Once every worker
+    has run out of boards within it and no batch is in flight, the
+    coordinator raises the bound to the lowest f still open. Without this
+    barrier, a worker whose share of the current f layer runs out races ahead
+    through boards that sequential A* never expands.
+"""
+
+import os
+import queue
+import time
+import multiprocessing
+from resource import getrusage, RUSAGE_SELF
+
+from utility.priority_queue import BucketPriorityQueue
+from utility.packed_board import (pack, move_table, is_solvable, print_path,
+                                  blank_offsets, MOVE_ORDER, REVERSE_MOVE,
+                                  TILE_BITS, TILE_MASK)
+from utility.heuristics import get_heuristic
+from utility.instrumentation import Instrumentation
+from utility.predecessor_table import MOVE_CODES
+
+_ROOT = len(MOVE_ORDER)
+_UNBOUNDED = 1 << 30
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_HASH_MASK = (1 << 64) - 1
+
+# Children queued for one owner before the batch is sent
+BATCH_SIZE = 256
+# Expansions between two looks at the inbox
+EXPANSIONS_PER_POLL = 512
+# Seconds between the coordinator's checks, and between an idle worker's
+# looks at the f bound
+POLL_PERIOD = 0.005
+
+
+def owner_of(key, workers):
+    """
+        Packed keys of neighbouring boards differ in a few nibbles only, so
+        they are mixed before picking the owner
+    """
+    return (((key * _HASH_MULTIPLIER) & _HASH_MASK) >> 32) % workers
+
+
+class _Worker:
+
+    """
+        One worker's share of the search, run in its own process
+    """
+
+    __slots__ = ('index', 'workers', 'n', 'goal_key', 'moves', 'heuristic',
+                 'inboxes', 'replies', 'incumbent', 'bound', 'lowest_f',
+                 'idle', 'sent', 'received', 'done', 'best', 'open',
+                 'outboxes',
+                 'expansions', 'generations', 'duplicates',
+                 'max_frontier_size', 'max_search_depth')
+
+    def __init__(self, index, n, goal_state, heuristic, inboxes, replies,
+                 incumbent, bound, lowest_f, idle, sent, received,
+                 done):
+        self.index = index
+        self.workers = len(inboxes)
+        self.n = n
+        self.goal_key = pack(goal_state)
+        self.moves = move_table(n)
+        self.heuristic = get_heuristic(heuristic, goal_state, n)
+        self.inboxes = inboxes
+        self.replies = replies
+        self.incumbent = incumbent
+        self.bound = bound
+        self.lowest_f = lowest_f
+        self.idle = idle
+        self.sent = sent
+        self.received = received
+        self.done = done
+        # key -> (cheapest g, code of the move that reached it)
+        self.best = dict()
+        self.open = BucketPriorityQueue()
+        self.outboxes = [[] for _ in range(self.workers)]
+        self.expansions = 0
+        self.generations = 0
+        self.duplicates = 0
+        self.max_frontier_size = 0
+        self.max_search_depth = 0
+
+    def _insert(self, key, blank, g, h, code):
+        if g + h >= self.incumbent.value:
+            return
+        seen = self.best.get(key)
+        if seen is not None and seen[0] <= g:
+            self.duplicates += 1
+            return
+        self.best[key] = (g, code)
+        if key == self.goal_key:
+            with self.incumbent.get_lock():
+                if g < self.incumbent.value:
+                    self.incumbent.value = g
+            return
+        self.open.push((key, blank, g, h), g + h, tie_breaker=g,
+                       state_key=key)
+        if len(self.open) > self.max_frontier_size:
+            self.max_frontier_size = len(self.open)
+
+    def _receive(self, batch):
+        for key, blank, g, h, code in batch:
+            self._insert(key, blank, g, h, code)
+
+    def _send(self, owner):
+        self.inboxes[owner].put(self.outboxes[owner])
+        self.outboxes[owner] = []
+        with self.sent.get_lock():
+            self.sent.value += 1
+
+    def _flush(self):
+        for owner, outbox in enumerate(self.outboxes):
+            if outbox:
+                self._send(owner)
+
+    def _expand(self):
+        """
+            Expands up to EXPANSIONS_PER_POLL of the cheapest owned boards
+            within the f bound, returning False once none are left
+        """
+        update = self.heuristic.update
+        moves = self.moves
+        workers = self.workers
+        bound = self.bound.value
+        for _ in range(EXPANSIONS_PER_POLL):
+            if self.open.empty():
+                self.lowest_f[self.index] = _UNBOUNDED
+                return False
+            f, _order, entry = self.open.pop()
+            if f >= self.incumbent.value:
+                # Nothing left here can beat the incumbent
+                self.open.clear()
+                self.lowest_f[self.index] = _UNBOUNDED
+                return False
+            if f > bound:
+                self.open.push(entry, f, tie_breaker=entry[2],
+                               state_key=entry[0])
+                self.lowest_f[self.index] = f
+                return False
+
+            self.idle[self.index] = 0
+            (key, blank, g, h) = entry
+            self.expansions += 1
+            if g + 1 > self.max_search_depth:
+                self.max_search_depth = g + 1
+            code = self.best[key][1]
+            previous = (REVERSE_MOVE[MOVE_ORDER[code]] if code != _ROOT
+                        else None)
+            for action, target in moves[blank]:
+                if action == previous:
+                    continue
+                tile = (key >> (target * TILE_BITS)) & TILE_MASK
+                child_key = (key
+                             + (tile << (blank * TILE_BITS))
+                             - (tile << (target * TILE_BITS)))
+                child_h = update(h, key, child_key, blank, target)
+                self.generations += 1
+                owner = owner_of(child_key, workers)
+                if owner == self.index:
+                    self._insert(child_key, target, g + 1, child_h,
+                                 MOVE_CODES[action])
+                else:
+                    outbox = self.outboxes[owner]
+                    outbox.append((child_key, target, g + 1, child_h,
+                                   MOVE_CODES[action]))
+                    if len(outbox) >= BATCH_SIZE:
+                        self._send(owner)
+        return True
+
+    def run(self):
+        inbox = self.inboxes[self.index]
+        busy = False
+        while not self.done.is_set():
+            # Wait for batches only once our share of the f layer is done
+            block = not busy
+            while True:
+                try:
+                    batch = inbox.get(block, POLL_PERIOD)
+                except queue.Empty:
+                    break
+                # Busy before the batch is counted as received, so the
+                # coordinator never sees a quiet moment mid-handover
+                self.idle[self.index] = 0
+                with self.received.get_lock():
+                    self.received.value += 1
+                self._receive(batch)
+                block = False
+
+            busy = self._expand()
+            self._flush()
+            if not busy:
+                self.idle[self.index] = 1
+
+        # Only trace requests arrive from here on
+        self.replies.put(self.index)
+        self._answer_traces(inbox)
+
+    def _answer_traces(self, inbox):
+        """
+            Serves the coordinator's path lookups until told to exit
+        """
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            if isinstance(message, tuple):
+                self.replies.put(self.best[message[1]][1])
+
+        self.replies.put(dict(expansions=self.expansions,
+                              generations=self.generations,
+                              duplicates=self.duplicates,
+                              max_frontier_size=self.max_frontier_size,
+                              max_search_depth=self.max_search_depth,
+                              peak_memory=getrusage(RUSAGE_SELF).ru_maxrss))
+
+
+def _run_worker(*args):
+    _Worker(*args).run()
+
+
+class ParallelAStar:
+
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth', 'heuristic', 'workers',
+                 'worker_memory', 'instrumentation')
+
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 heuristic='manhattan', instrumentation=None, workers=None):
+        self.initial_state = initial_state
+        self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
+        self.start_ram_usage = start_ram_usage
+        self.nodes_expanded = 0
+        self.max_search_depth = 0
+        self.heuristic = heuristic
+        self.workers = workers or os.cpu_count() or 1
+        self.worker_memory = 0
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
+
+    def _run_layers(self, bound, incumbent, lowest_f, idle, sent, received,
+                    processes):
+        """
+            Raises the f bound each time the workers finish a layer, until no
+            open board can beat the incumbent. A layer is finished once two
+            checks in a row see every worker idle and the same balanced
+            message counts, so no batch slipped past in between.
+        """
+        previous = None
+        while True:
+            time.sleep(POLL_PERIOD)
+            if not all(process.is_alive() for process in processes):
+                raise Exception("a parallel A* worker died!")
+            snapshot = (sent.value, received.value)
+            quiet = all(idle) and snapshot[0] == snapshot[1]
+            if not quiet or snapshot != previous:
+                previous = snapshot if quiet else None
+                continue
+
+            lowest = min(lowest_f)
+            if lowest >= incumbent.value:
+                return
+            if lowest > bound.value:
+                bound.value = lowest
+            previous = None
+
+    def _reply(self, replies, processes):
+        while True:
+            try:
+                return replies.get(timeout=POLL_PERIOD)
+            except queue.Empty:
+                if not all(process.is_alive() for process in processes):
+                    raise Exception("a parallel A* worker died!")
+
+    def _path_to_goal(self, inboxes, replies, processes):
+        n = self.initial_state.n
+        offsets = blank_offsets(n)
+        key = self.goal_key
+        blank = self.goal_state.index(0)
+        actions = []
+        while True:
+            inboxes[owner_of(key, len(inboxes))].put(('trace', key))
+            code = self._reply(replies, processes)
+            if code == _ROOT:
+                break
+            action = MOVE_ORDER[code]
+            actions.append(action)
+            previous_blank = blank - offsets[action]
+            tile = (key >> (previous_blank * TILE_BITS)) & TILE_MASK
+            key = (key
+                   + (tile << (blank * TILE_BITS))
+                   - (tile << (previous_blank * TILE_BITS)))
+            blank = previous_blank
+        actions.reverse()
+        return actions
+
+    def search(self, display_path=False):
+
+        n = self.initial_state.n
+        if not is_solvable(self.initial_state.config, n, self.goal_state):
+            return (False, [], 0, 0, 0)
+
+        self.instrumentation.start()
+        context = multiprocessing.get_context()
+        workers = self.workers
+        inboxes = [context.Queue() for _ in range(workers)]
+        replies = context.Queue()
+        incumbent = context.Value('i', _UNBOUNDED)
+        bound = context.Value('i', 0, lock=False)
+        lowest_f = context.Array('i', [_UNBOUNDED] * workers, lock=False)
+        idle = context.Array('b', [0] * workers, lock=False)
+        sent = context.Value('l', 0)
+        received = context.Value('l', 0)
+        done = context.Event()
+
+        # Seed the owner of the initial board with it
+        key = self.initial_state.key
+        h = get_heuristic(self.heuristic, self.goal_state, n).cost(key)
+        bound.value = h
+        inboxes[owner_of(key, workers)].put(
+            [(key, self.initial_state.blank_index, 0, h, _ROOT)])
+        sent.value = 1
+
+        processes = [context.Process(
+            target=_run_worker,
+            args=(index, n, self.goal_state, self.heuristic, inboxes,
+                  replies, incumbent, bound, lowest_f, idle, sent, received,
+                  done),
+            daemon=True) for index in range(workers)]
+        for process in processes:
+            process.start()
+
+        try:
+            self._run_layers(bound, incumbent, lowest_f, idle, sent,
+                             received, processes)
+            done.set()
+            for _ in processes:
+                self._reply(replies, processes)
+
+            path_to_goal = None
+            if incumbent.value != _UNBOUNDED:
+                path_to_goal = self._path_to_goal(inboxes, replies, processes)
+
+            for inbox in inboxes:
+                inbox.put(None)
+            self._collect_statistics([self._reply(replies, processes)
+                                      for _ in processes])
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            self.instrumentation.stop()
+
+        if path_to_goal is None:
+            return (False, [], 0, self.nodes_expanded, 0)
+
+        if display_path:
+            print_path(self.initial_state, path_to_goal)
+
+        return (True, path_to_goal, len(path_to_goal),
+                self.nodes_expanded, len(path_to_goal))
+
+    def _collect_statistics(self, statistics):
+        instrumentation = self.instrumentation
+        for worker in statistics:
+            self.nodes_expanded += worker['expansions']
+            self.max_search_depth = max(self.max_search_depth,
+                                        worker['max_search_depth'])
+            self.worker_memory += max(0, worker['peak_memory']
+                                      - self.start_ram_usage)
+            instrumentation.expansions += worker['expansions']
+            instrumentation.generations += worker['generations']
+            instrumentation.duplicates += worker['duplicates']
+            # Frontiers are disjoint, so their peaks add up at worst
+            instrumentation.max_frontier_size += worker['max_frontier_size']
+
+    def get_max_ram_usage(self):
+        return self.instrumentation.peak_memory + self.worker_memory
+
+    def get_max_search_depth(self):
+        return self.max_search_depth
@@ -0,0 +1,265 @@
+"""
+    Additive Disjoint Pattern Databases
+
+    A pattern database stores, for every placement of a subset of tiles, the
+    number of moves of those tiles needed to bring them home. Only moves of
+    pattern tiles are counted, so the values of disjoint patterns add up to
+    an admissible heuristic.
+
+    Tables are built offline with a retrograde BFS from the goal and saved as
+    one byte per placement; loading mmaps the file so startup costs nothing.
+
+        python -m utility.pattern_database 4 6-6-3
+"""
+
+import argparse
+import mmap
+import os
+import struct
+
+from utility.packed_board import goal_config, TILE_BITS, TILE_MASK
+
+_MAGIC = b'PDB1'
+_UNSEEN = 0xFF
+
+PDB_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'pdb')
+
+# Disjoint tile partitions for the goal with the blank in the top-left corner
+PARTITIONS = {
+    (3, '4-4'): ((1, 2, 3, 4), (5, 6, 7, 8)),
+    (4, '5-5-5'): ((1, 2, 3, 6, 7), (4, 5, 8, 9, 12), (10, 11, 13, 14, 15)),
+    (4, '6-6-3'): ((4, 5, 8, 9, 12, 13), (6, 7, 10, 11, 14, 15), (1, 2, 3)),
+}
+
+DEFAULT_PARTITIONS = {3: '4-4', 4: '5-5-5'}
+
+
+def default_path(n, partition=None):
+    partition = partition or DEFAULT_PARTITIONS[n]
+    return os.path.join(PDB_DIRECTORY, f'{n * n - 1}-puzzle-{partition}.pdb')
+
+
+def placement_count(cells, k):
+    count = 1
+    for i in range(k):
+        count *= cells - i
+    return count
+
+
+def rank_placement(positions, cells):
+    """
+        Ranks distinct cell positions as a partial permutation, in
+        [0, cells! / (cells - k)!)
+    """
+    rank = 0
+    for i, position in enumerate(positions):
+        digit = position
+        for j in range(i):
+            if positions[j] < position:
+                digit -= 1
+        rank = rank * (cells - i) + digit
+    return rank
+
+
+def _pattern_positions(key, slots, cells):
+    positions = [0] * len(slots)
+    for idx in range(cells):
+        slot = slots.get((key >> (idx * TILE_BITS)) & TILE_MASK)
+        if slot is not None:
+            positions[slot] = idx
+    return positions
+
+
+class PatternDatabase:
+
+    """
+        One pattern's table, indexed by the rank of its tile positions
+    """
+
+    __slots__ = ('pattern', 'n', 'cells', 'slots', 'table')
+
+    def __init__(self, pattern, n, table):
+        self.pattern = tuple(pattern)
+        self.n = n
+        self.cells = n * n
+        self.slots = dict((tile, slot) for slot, tile in enumerate(pattern))
+        self.table = table
+
+    def cost(self, key):
+        """
+            Moves of the pattern tiles needed to solve the packed board key
+        """
+        positions = _pattern_positions(key, self.slots, self.cells)
+        return self.table[rank_placement(positions, self.cells)]
+
+    @classmethod
+    def build(cls, pattern, n, goal_state=None):
+        """
+            Retrograde BFS from the goal over (pattern placement, blank)
+            states. Blank moves onto non-pattern cells are free, so each
+            layer is first closed under free moves and then expanded by one
+            pattern tile move.
+        """
+        goal_state = goal_state or goal_config(n)
+        cells = n * n
+        k = len(pattern)
+        table = bytearray([_UNSEEN]) * placement_count(cells, k)
+        # Boards are encoded as the pattern positions packed 4 bits per
+        # tile, followed by the blank position
+        seen = bytearray((1 << (TILE_BITS * (k + 1))) // 8 + 1)
+
+        neighbours = []
+        for idx in range(cells):
+            row, col = idx // n, idx % n
+            neighbours.append(tuple(
+                target for target, legal in ((idx - n, row > 0),
+                                             (idx + n, row < n - 1),
+                                             (idx - 1, col > 0),
+                                             (idx + 1, col < n - 1))
+                if legal))
+
+        def _encode(positions, blank):
+            code = blank
+            for position in positions:
+                code = (code << TILE_BITS) | position
+            return code
+
+        def _decode(code):
+            positions = [0] * k
+            for slot in range(k - 1, -1, -1):
+                positions[slot] = code & TILE_MASK
+                code >>= TILE_BITS
+            return positions, code
+
+        def _mark(code):
+            if seen[code >> 3] & (1 << (code & 7)):
+                return False
+            seen[code >> 3] |= 1 << (code & 7)
+            return True
+
+        start = _encode([goal_state.index(tile) for tile in pattern],
+                        goal_state.index(0))
+        _mark(start)
+        layer = [start]
+        distance = 0
+        while layer:
+            closed = []
+            while layer:
+                code = layer.pop()
+                closed.append(code)
+                positions, blank = _decode(code)
+                rank = rank_placement(positions, cells)
+                if table[rank] == _UNSEEN:
+                    table[rank] = distance
+                for target in neighbours[blank]:
+                    if target not in positions:
+                        child = _encode(positions, target)
+                        if _mark(child):
+                            layer.append(child)
+
+            for code in closed:
+                positions, blank = _decode(code)
+                for target in neighbours[blank]:
+                    if target in positions:
+                        moved = list(positions)
+                        moved[positions.index(target)] = blank
+                        child = _encode(moved, target)
+                        if _mark(child):
+                            layer.append(child)
+            distance += 1
+        return cls(pattern, n, table)
+
+
+class AdditivePatternDatabase:
+
+    """
+        A set of disjoint pattern databases whose costs are summed
+    """
+
+    __slots__ = ('n', 'goal_state', 'databases', 'tile_database', '_mmap')
+
+    def __init__(self, n, goal_state, databases, _mmap=None):
+        self.n = n
+        self.goal_state = tuple(goal_state)
+        self.databases = tuple(databases)
+        self.tile_database = dict((tile, database)
+                                  for database in self.databases
+                                  for tile in database.pattern)
+        self._mmap = _mmap
+
+    def cost(self, key):
+        return sum(database.cost(key) for database in self.databases)
+
+    @classmethod
+    def build(cls, n, partition=None, goal_state=None):
+        goal_state = goal_state or goal_config(n)
+        if isinstance(partition, str) or partition is None:
+            partition = PARTITIONS[(n, partition or DEFAULT_PARTITIONS[n])]
+        return cls(n, goal_state, [PatternDatabase.build(pattern, n,
+                                                         goal_state)
+                                   for pattern in partition])
+
+    def save(self, path):
+        """
+            Layout: magic, n, pattern count, goal, then for every pattern its
+            size, tiles and one byte per placement
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as pdb_file:
+            pdb_file.write(_MAGIC)
+            pdb_file.write(struct.pack('BB', self.n, len(self.databases)))
+            pdb_file.write(bytes(self.goal_state))
+            for database in self.databases:
+                pdb_file.write(struct.pack('B', len(database.pattern)))
+                pdb_file.write(bytes(database.pattern))
+            for database in self.databases:
+                pdb_file.write(database.table)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as pdb_file:
+            _mmap = mmap.mmap(pdb_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if _mmap[:4] != _MAGIC:
+            raise Exception(f"{path} is not a pattern database!")
+        n, pattern_count = _mmap[4], _mmap[5]
+        offset = 6
+        goal_state = tuple(_mmap[offset:offset + n * n])
+        offset += n * n
+
+        patterns = []
+        for _ in range(pattern_count):
+            k = _mmap[offset]
+            patterns.append(tuple(_mmap[offset + 1:offset + 1 + k]))
+            offset += 1 + k
+
+        databases = []
+        view = memoryview(_mmap)
+        for pattern in patterns:
+            size = placement_count(n * n, len(pattern))
+            databases.append(PatternDatabase(pattern, n,
+                                             view[offset:offset + size]))
+            offset += size
+        return cls(n, goal_state, databases, _mmap=_mmap)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build an additive pattern database")
+    parser.add_argument('n', type=int, help="board dimension")
+    parser.add_argument('partition', nargs='?', default=None,
+                        help="tile partition, e.g. 4-4, 5-5-5 or 6-6-3")
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    partition = args.partition or DEFAULT_PARTITIONS[args.n]
+    path = args.output or default_path(args.n, partition)
+    AdditivePatternDatabase.build(args.n, partition).save(path)
+    print(f"Pattern database written to {path}")
+
+
+if __name__ == '__main__':
+    main()
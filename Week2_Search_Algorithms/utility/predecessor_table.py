@@ -0,0 +1,63 @@
+"""
+    Predecessor Table
+
+    Records, for every reached packed board, only the move that first reached
+    it (a code in 0-3), so searches need not keep PuzzleState parent chains
+    alive. The path is rebuilt by undoing moves back from the goal.
+
+    bfs, dfs and ast use it in place of their visited set when asked to
+    record moves. The table replaces the set rather than adding to it, and
+    it lets expanded boards be freed, but the frontier still holds full
+    states, so the peak falls only a little (about 27 to 23 MB for BFS on
+    the hardest 8-puzzle). It is a cheap toggle, not a memory fix.
+"""
+
+from utility.packed_board import slide, blank_offsets, MOVE_ORDER
+
+MOVE_CODES = dict((action, code) for code, action in enumerate(MOVE_ORDER))
+_ROOT = len(MOVE_ORDER)
+
+
+class PredecessorTable:
+
+    __slots__ = ('n', 'initial_key', 'moves', '_blank_offsets')
+
+    def __init__(self, initial_key, n):
+        self.n = n
+        self.initial_key = initial_key
+        self.moves = {initial_key: _ROOT}
+        # How far each move shifts the blank
+        self._blank_offsets = blank_offsets(n)
+
+    def __contains__(self, key):
+        return key in self.moves
+
+    def __len__(self):
+        return len(self.moves)
+
+    def add(self, key, action):
+        """
+            Records (or, on a cheaper path, overwrites) the move reaching key
+        """
+        self.moves[key] = MOVE_CODES[action]
+
+    def path_to(self, key, blank_index):
+        """
+            Actions from the initial board to key, whose blank is at
+            blank_index
+        """
+        actions = []
+        code = self.moves[key]
+        while code != _ROOT:
+            action = MOVE_ORDER[code]
+            actions.append(action)
+            # Slide the blank back to where it was before the move
+            previous_blank = blank_index - self._blank_offsets[action]
+            key = slide(key, blank_index, previous_blank)
+            blank_index = previous_blank
+            code = self.moves[key]
+        actions.reverse()
+        return actions
+
+    def clear(self):
+        self.moves.clear()
@@ -10,6 +10,9 @@ class PriorityQueue:
         self._queue = []
         self._index = 0
 
+    def __len__(self):
+        return len(self._queue)
+
     def empty(self):
         return len(self._queue) == 0
 
@@ -22,3 +25,78 @@ class PriorityQueue:
 
     def clear(self):
         self._queue.clear()
+
+
+class BucketPriorityQueue:
+
+    """
+        Monotone priority queue for small non-negative int priorities, such
+        as A* f-costs on sliding puzzles. Bucket f holds one LIFO stack per
+        tie breaker value and the largest tie breaker pops first, so A*
+        prefers the deepest node among equal f-costs.
+
+        Pushing a key under a state_key that is already queued replaces the
+        old entry, which is dropped lazily when it reaches the front.
+    """
+
+    __slots__ = ('_buckets', '_min_priority', '_index', '_size', '_live')
+
+    def __init__(self):
+        self._buckets = []
+        self._min_priority = 0
+        self._index = 0
+        self._size = 0
+        self._live = dict()
+
+    def __len__(self):
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def push(self, key, priority, tie_breaker=0, state_key=None):
+        while len(self._buckets) <= priority:
+            self._buckets.append([])
+        stacks = self._buckets[priority]
+        while len(stacks) <= tie_breaker:
+            stacks.append([])
+        stacks[tie_breaker].append((self._index, state_key, key))
+
+        if state_key is None or state_key not in self._live:
+            self._size += 1
+        if state_key is not None:
+            self._live[state_key] = self._index
+
+        if priority < self._min_priority or self._size == 1:
+            self._min_priority = priority
+        self._index += 1
+
+    def pop(self):
+        live = self._live
+        buckets = self._buckets
+        priority = self._min_priority
+
+        while priority < len(buckets):
+            stacks = buckets[priority]
+            while stacks and not stacks[-1]:
+                stacks.pop()
+            if not stacks:
+                priority += 1
+                continue
+
+            index, state_key, key = stacks[-1].pop()
+            if state_key is not None:
+                if live.get(state_key) != index:
+                    continue  # Superseded by a cheaper entry
+                del live[state_key]
+            self._size -= 1
+            self._min_priority = priority
+            return (priority, index, key)
+
+        raise IndexError('pop from an empty priority queue')
+
+    def clear(self):
+        self._buckets.clear()
+        self._live.clear()
+        self._min_priority = 0
+        self._size = 0
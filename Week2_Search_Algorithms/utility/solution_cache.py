@@ -0,0 +1,148 @@
+"""
+    Persistent Solution Cache
+
+    Remembers optimal solutions across runs in a local SQLite file keyed by
+    packed board. Every suffix of an optimal path is itself optimal, so
+    storing one solution also stores the remaining moves of every board along
+    it. A small in-process LRU sits in front of the file, and the file is
+    trimmed back below max_entries by dropping the least recently used
+    boards. Hits only note when they happened, and the notes are written in
+    one batch by the next put or by close, so a lookup never commits.
+"""
+
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+from utility.packed_board import pack, slide, blank_offsets
+
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'tables')
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIRECTORY, 'solutions.sqlite')
+
+# Actions are stored by their initials, one character per move
+_ACTION_LETTERS = {'Up': 'U', 'Down': 'D', 'Left': 'L', 'Right': 'R'}
+_LETTER_ACTIONS = dict((letter, action)
+                       for action, letter in _ACTION_LETTERS.items())
+
+
+def _board_bytes(key):
+    # A 15-puzzle key needs all 64 bits, more than an SQLite INTEGER holds
+    return key.to_bytes(8, 'little')
+
+
+class SolutionCache:
+
+    __slots__ = ('path', 'max_entries', 'memory_entries', 'connection',
+                 'recent', 'used', 'hits', 'misses')
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=1000000,
+                 memory_entries=4096):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS solutions ('
+            ' n INTEGER NOT NULL,'
+            ' board BLOB NOT NULL,'
+            ' suffix TEXT NOT NULL,'
+            ' last_used REAL NOT NULL,'
+            ' PRIMARY KEY (n, board))')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS solutions_last_used'
+            ' ON solutions (last_used)')
+        self.connection.commit()
+        # (n, key) -> suffix, most recently used last
+        self.recent = OrderedDict()
+        # (n, key) -> time of its latest hit, not yet written to the file
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, cache_key, suffix):
+        self.recent[cache_key] = suffix
+        self.recent.move_to_end(cache_key)
+        if len(self.recent) > self.memory_entries:
+            self.recent.popitem(last=False)
+
+    def get(self, key, n):
+        """
+            Optimal actions from the packed board key to the goal, or None
+        """
+        cache_key = (n, key)
+        suffix = self.recent.get(cache_key)
+        if suffix is None:
+            row = self.connection.execute(
+                'SELECT suffix FROM solutions WHERE n = ? AND board = ?',
+                (n, _board_bytes(key))).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            suffix = row[0]
+        self.used[cache_key] = time.time()
+        self._remember(cache_key, suffix)
+        self.hits += 1
+        return [_LETTER_ACTIONS[letter] for letter in suffix]
+
+    def put(self, config, n, path_to_goal):
+        """
+            Stores an optimal path from config and every suffix of it
+        """
+        offsets = blank_offsets(n)
+        letters = ''.join(_ACTION_LETTERS[action] for action in path_to_goal)
+        key = pack(config)
+        blank = list(config).index(0)
+        now = time.time()
+
+        rows = []
+        for step, action in enumerate(path_to_goal):
+            suffix = letters[step:]
+            rows.append((n, _board_bytes(key), suffix, now))
+            self._remember((n, key), suffix)
+            target = blank + offsets[action]
+            key = slide(key, blank, target)
+            blank = target
+
+        with self.connection:
+            # A stored suffix is already optimal, so keep it
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO solutions VALUES (?, ?, ?, ?)', rows)
+            self._write_used()
+        self._evict()
+
+    def _write_used(self):
+        # Runs inside the caller's transaction
+        self.connection.executemany(
+            'UPDATE solutions SET last_used = ? WHERE n = ? AND board = ?',
+            [(last_used, n, _board_bytes(key))
+             for (n, key), last_used in self.used.items()])
+        self.used.clear()
+
+    def _evict(self):
+        (count,) = self.connection.execute(
+            'SELECT COUNT(*) FROM solutions').fetchone()
+        if count <= self.max_entries:
+            return
+        # Trim a tenth below the bound, so eviction does not run every put
+        excess = count - self.max_entries * 9 // 10
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM solutions WHERE rowid IN (SELECT rowid FROM'
+                ' solutions ORDER BY last_used LIMIT ?)', (excess,))
+        self.recent.clear()
+
+    def __len__(self):
+        (count,) = self.connection.execute(
+            'SELECT COUNT(*) FROM solutions').fetchone()
+        return count
+
+    def close(self):
+        if self.used:
+            with self.connection:
+                self._write_used()
+        self.connection.close()
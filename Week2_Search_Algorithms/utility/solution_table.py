@@ -0,0 +1,245 @@
+"""
+    Optimal Solution Table
+
+    The 8-puzzle has only 9!/2 reachable boards, so a single backward BFS
+    from the goal can record every board's distance and optimal next move.
+    Reachable boards are perfectly hashed onto 0 .. 9!/2 - 1 (see
+    solvable_rank) and stored one byte per rank, (distance << 2) | move code,
+    in a file of 181,440 bytes that is mmapped at load time. Solving a board
+    is then one lookup per move.
+
+        python -m utility.solution_table
+"""
+
+import mmap
+import os
+from collections import deque
+
+from utility.packed_board import (pack, unpack, slide, move_table, goal_config,
+                                  print_path, MOVE_ORDER, REVERSE_MOVE)
+from utility.predecessor_table import MOVE_CODES
+from utility.instrumentation import Instrumentation
+
+_MAGIC = b'SOL2'
+_UNREACHED = 0xFF
+
+TABLE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'tables')
+MAX_DIMENSION = 3
+
+
+def default_path(n=3):
+    return os.path.join(TABLE_DIRECTORY, f'{n * n - 1}-puzzle-solutions.tbl')
+
+
+def _factorials(count):
+    factorials = [1]
+    for i in range(1, count):
+        factorials.append(factorials[-1] * i)
+    return factorials
+
+
+def solvable_rank(config, n, goal_order, goal_blank_row, factorials):
+    """
+        Perfect hash of the boards that can reach the goal onto
+        0 .. (n * n)! / 2 - 1, or None for one that cannot. The tiles,
+        renumbered by their order in the goal, are ranked by their Lehmer
+        code. Its last digit is fixed by the inversion parity a solvable
+        board needs, so it is dropped, halving the ranks, and the blank's
+        index is appended.
+    """
+    tiles = [goal_order[tile] for tile in config if tile]
+    size = len(tiles)
+    blank = list(config).index(0)
+    rank = 0
+    inversions = 0
+    for i in range(size - 1):
+        tile = tiles[i]
+        smaller = 0
+        for later_tile in tiles[i + 1:]:
+            if later_tile < tile:
+                smaller += 1
+        inversions += smaller
+        if i < size - 2:
+            # Every factorial here is even
+            rank += smaller * factorials[size - 1 - i] // 2
+    # Same parity test as packed_board.is_solvable
+    parity = 0 if n % 2 else abs(blank // n - goal_blank_row) % 2
+    if inversions % 2 != parity:
+        return None
+    return rank * n * n + blank
+
+
+class SolutionTable:
+
+    __slots__ = ('n', 'goal_state', 'table', 'goal_order', 'goal_blank_row',
+                 'factorials', '_mmap')
+
+    def __init__(self, n, goal_state, table, _mmap=None):
+        self.n = n
+        self.goal_state = tuple(goal_state)
+        self.table = table
+        self.goal_order = dict((tile, order) for order, tile in enumerate(
+            tile for tile in self.goal_state if tile))
+        self.goal_blank_row = self.goal_state.index(0) // n
+        self.factorials = _factorials(n * n - 1)
+        self._mmap = _mmap
+
+    def rank(self, config):
+        return solvable_rank(config, self.n, self.goal_order,
+                             self.goal_blank_row, self.factorials)
+
+    @classmethod
+    def build(cls, n=3, goal_state=None):
+        if n > MAX_DIMENSION:
+            raise Exception("only boards up to 3x3 fit in a solution table!")
+
+        goal_state = tuple(goal_state or goal_config(n))
+        # One entry per board that can reach the goal
+        solution_table = cls(n, goal_state, bytearray(
+            [_UNREACHED]) * (_factorials(n * n + 1)[-1] // 2))
+        table = solution_table.table
+        moves = move_table(n)
+
+        goal_key = pack(goal_state)
+        table[solution_table.rank(goal_state)] = 0
+        frontier = deque([(goal_key, goal_state.index(0), 0)])
+        while frontier:
+            key, blank, distance = frontier.popleft()
+            for action, target in moves[blank]:
+                child_key = slide(key, blank, target)
+                rank = solution_table.rank(unpack(child_key, n))
+                if table[rank] == _UNREACHED:
+                    # Undoing the move leads one step closer to the goal
+                    code = MOVE_CODES[REVERSE_MOVE[action]]
+                    table[rank] = ((distance + 1) << 2) | code
+                    frontier.append((child_key, target, distance + 1))
+        return solution_table
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as table_file:
+            table_file.write(_MAGIC)
+            table_file.write(bytes([self.n]))
+            table_file.write(bytes(self.goal_state))
+            table_file.write(self.table)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as table_file:
+            _mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if _mmap[:4] != _MAGIC:
+            raise Exception(f"{path} is not a current solution table, "
+                            "rebuild it with 'python -m "
+                            "utility.solution_table'")
+        n = _mmap[4]
+        offset = 5 + n * n
+        goal_state = tuple(_mmap[5:offset])
+        return cls(n, goal_state, memoryview(_mmap)[offset:], _mmap=_mmap)
+
+    def distance(self, config):
+        rank = self.rank(config)
+        if rank is None:
+            return None
+        entry = self.table[rank]
+        return None if entry == _UNREACHED else entry >> 2
+
+    def solve(self, config):
+        """
+            Optimal actions from config to the goal, or None when the goal
+            cannot be reached
+        """
+        n = self.n
+        moves = move_table(n)
+        key = pack(config)
+        blank = list(config).index(0)
+        if self.rank(config) is None:
+            return None
+        actions = []
+        while True:
+            entry = self.table[self.rank(unpack(key, n))]
+            if entry == _UNREACHED:
+                return None
+            if entry >> 2 == 0:
+                return actions
+            action = MOVE_ORDER[entry & 3]
+            target = dict(moves[blank])[action]
+            key = slide(key, blank, target)
+            blank = target
+            actions.append(action)
+
+
+_table_cache = dict()
+
+
+def load_table(path=None):
+    """
+        Loads a table once per process
+    """
+    path = path or default_path()
+    table = _table_cache.get(path)
+    if table is None:
+        if not os.path.exists(path):
+            raise Exception(f"No solution table at {path}, build it with "
+                            "'python -m utility.solution_table'")
+        table = SolutionTable.load(path)
+        _table_cache[path] = table
+    return table
+
+
+class TableSearch:
+
+    """
+        Answers from the solution table instead of searching, with the same
+        interface as the searches
+    """
+
+    __slots__ = ('initial_state', 'goal_state', 'start_ram_usage',
+                 'max_search_depth', 'table', 'instrumentation')
+
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 instrumentation=None, path=None):
+        self.initial_state = initial_state
+        self.goal_state = tuple(goal_state)
+        self.start_ram_usage = start_ram_usage
+        self.max_search_depth = 0
+        self.table = load_table(path)
+        if self.table.n != initial_state.n or \
+                self.table.goal_state != self.goal_state:
+            raise Exception("the solution table was built for another board!")
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
+
+    def search(self, display_path=False):
+
+        self.instrumentation.start()
+        path_to_goal = self.table.solve(self.initial_state.config)
+        self.instrumentation.stop()
+
+        if path_to_goal is None:
+            return (False, [], 0, 0, 0)
+
+        if display_path:
+            print_path(self.initial_state, path_to_goal)
+
+        self.max_search_depth = len(path_to_goal)
+        return (True, path_to_goal, len(path_to_goal), 0, len(path_to_goal))
+
+    def get_max_ram_usage(self):
+        return self.instrumentation.peak_memory
+
+    def get_max_search_depth(self):
+        return self.max_search_depth
+
+
+def main():
+    path = default_path()
+    SolutionTable.build().save(path)
+    print(f"Solution table written to {path}")
+
+
+if __name__ == '__main__':
+    main()
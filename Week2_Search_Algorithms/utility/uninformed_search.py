@@ -1,47 +1,77 @@
 
 from collections import deque
-from resource import getrusage, RUSAGE_SELF
+
+from utility.packed_board import pack
+from utility.instrumentation import Instrumentation
+from utility.predecessor_table import PredecessorTable
 
 
 class UninformedSearch:
 
-    __slots__ = ('intial_state', 'goal_state', 'start_ram_usage',
-                 'nodes_expanded', 'max_ram_usage', 'max_search_depth',
-                 'visited_nodes', 'unexplored_nodes', 'current_state')
+    __slots__ = ('initial_state', 'goal_state', 'goal_key', 'start_ram_usage',
+                 'nodes_expanded', 'max_search_depth',
+                 'visited_nodes', 'unexplored_nodes', 'current_state',
+                 'instrumentation', 'predecessors', 'unmarked_root')
 
-    def __init__(self, initial_state, goal_state, start_ram_usage=0):
+    def __init__(self, initial_state, goal_state, start_ram_usage=0,
+                 instrumentation=None, record_moves=False):
         self.initial_state = initial_state
         self.goal_state = goal_state
+        self.goal_key = pack(goal_state)
         self.start_ram_usage = start_ram_usage
         self.nodes_expanded = 0
-        self.max_ram_usage = 0
         self.max_search_depth = 0
         self.visited_nodes = set()
+        # With record_moves, see utility.predecessor_table
+        self.predecessors = None
+        # The initial board is not marked visited, so it is queued once
+        # more when first reached again. The predecessor table holds it from
+        # the start and lets it through once, so the counts match.
+        self.unmarked_root = None
+        if record_moves:
+            self.predecessors = PredecessorTable(initial_state.key,
+                                                 initial_state.n)
+            self.visited_nodes = self.predecessors
+            self.unmarked_root = initial_state.key
         self.current_state = self.initial_state
         self.unexplored_nodes = deque([(self.initial_state, 0)])
+        self.instrumentation = instrumentation or Instrumentation(
+            start_ram_usage=start_ram_usage)
 
     def _expand_current_node(self, current_depth=0, reversed=False):
-        children = self.current_state.expand()
+        children = self.current_state.expand(
+            link_parent=self.predecessors is None)
 
         if reversed:
             children.reverse()  # Reverse children in-place
 
         # Iterating the children keeps expanding the graph size in RAM
         self.nodes_expanded += 1
+        instrumentation = self.instrumentation
+        instrumentation.generations += len(children)
         for child in children:
-            if tuple(child.config) not in self.visited_nodes:
-                self.visited_nodes.add(tuple(child.config))
-                self.max_search_depth = max(self.max_search_depth,
-                                            current_depth+1)
-                self.unexplored_nodes.append((child, current_depth + 1))
-                _ram_usage = getrusage(RUSAGE_SELF).ru_maxrss
-                current_ram_usage = _ram_usage - self.start_ram_usage
-                self.max_ram_usage = max(self.max_ram_usage, current_ram_usage)
+            if child.key in self.visited_nodes:
+                if child.key != self.unmarked_root:
+                    instrumentation.duplicates += 1
+                    continue
+                # Keeps the root's entry, the path back ends there
+                self.unmarked_root = None
+            elif self.predecessors is None:
+                self.visited_nodes.add(child.key)
+            else:
+                self.predecessors.add(child.key, child.action)
+            self.max_search_depth = max(self.max_search_depth,
+                                        current_depth+1)
+            self.unexplored_nodes.append((child, current_depth + 1))
+        instrumentation.expanded(len(self.unexplored_nodes))
 
     def is_goal(self):
-        return self.current_state.config == self.goal_state
+        return self.current_state.key == self.goal_key
 
     def _path_to_goal(self, display=False):
+        if self.predecessors is not None:
+            return self._recorded_path_to_goal(display=display)
+
         actions_to_goal = [self.current_state.action]
         path_to_goal = [self.current_state]
         parent_node = self.current_state.parent
@@ -60,8 +90,22 @@ class UninformedSearch:
         actions_to_goal.reverse()
         return actions_to_goal
 
+    def _recorded_path_to_goal(self, display=False):
+        actions_to_goal = self.predecessors.path_to(
+            self.current_state.key, self.current_state.blank_index)
+
+        if display:
+            state = self.initial_state
+            print("Game Path: \n")
+            for action in actions_to_goal:
+                state = getattr(state, 'move_' + action.lower())()
+                state.display()
+                print("\n")
+
+        return actions_to_goal
+
     def get_max_ram_usage(self):
-        return self.max_ram_usage
+        return self.instrumentation.peak_memory
 
     def get_max_search_depth(self):
         return self.max_search_depth
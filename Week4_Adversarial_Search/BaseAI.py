@@ -1,3 +1,3 @@
 class BaseAI:
-    def getMove(self, grid):
+    def getMove(self, grid, deadline=None):
         pass
@@ -0,0 +1,242 @@
+from Grid import Grid, vecIndex, UP, DOWN, LEFT, RIGHT
+
+# A 4x4 board packed into one int: cell (x, y) is the nibble at bit
+# 4 * (4 * x + y) and holds log2 of its tile, 0 for an empty cell. Row x is
+# the 16 bit chunk at bit 16 * x with column 0 in its lowest nibble.
+SIZE = 4
+ROW_MASK = 0xFFFF
+CELL_MASK = 0xF
+# Exponents saturate here; 2 ** 15 = 32768 is far beyond reach
+MAX_EXPONENT = 15
+
+
+def _rowCells(row):
+    return [(row >> (4 * y)) & CELL_MASK for y in range(SIZE)]
+
+
+def _packRow(cells):
+    row = 0
+    for y, cell in enumerate(cells):
+        row |= cell << (4 * y)
+    return row
+
+
+def _reverseRow(row):
+    return _packRow(_rowCells(row)[::-1])
+
+
+def _slideRowLeft(row):
+    # Same compaction and single merge per pair as Grid.merge
+    cells = [cell for cell in _rowCells(row) if cell]
+    merged = []
+    i = 0
+    while i < len(cells):
+        if i + 1 < len(cells) and cells[i] == cells[i + 1]:
+            merged.append(min(cells[i] + 1, MAX_EXPONENT))
+            i += 2
+        else:
+            merged.append(cells[i])
+            i += 1
+    return _packRow(merged + [0] * (SIZE - len(merged)))
+
+
+def _rowCanMerge(row):
+    cells = _rowCells(row)
+    return any(cells[y] and cells[y] == cells[y + 1]
+               for y in range(SIZE - 1))
+
+
+# Every possible row, moved left and right
+rowLeft = [_slideRowLeft(row) for row in range(1 << 16)]
+rowRight = [_reverseRow(rowLeft[_reverseRow(row)]) for row in range(1 << 16)]
+rowCanMerge = [_rowCanMerge(row) for row in range(1 << 16)]
+
+_LOW_BITS = 0x1111111111111111
+
+
+def transpose(board):
+    # Swaps cell (x, y) with (y, x) in two rounds of masked shifts
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _moveRows(board, table):
+    return (table[board & ROW_MASK]
+            | (table[(board >> 16) & ROW_MASK] << 16)
+            | (table[(board >> 32) & ROW_MASK] << 32)
+            | (table[(board >> 48) & ROW_MASK] << 48))
+
+
+def moveBoard(board, dir):
+    if dir == LEFT:
+        return _moveRows(board, rowLeft)
+    if dir == RIGHT:
+        return _moveRows(board, rowRight)
+    # Columns become rows, so up is left and down is right
+    if dir == UP:
+        return transpose(_moveRows(transpose(board), rowLeft))
+    if dir == DOWN:
+        return transpose(_moveRows(transpose(board), rowRight))
+
+
+def emptyMask(board):
+    # Low bit of every empty nibble
+    x = board | (board >> 1)
+    x |= x >> 2
+    return ~x & _LOW_BITS
+
+
+def countEmpty(board):
+    return bin(emptyMask(board)).count('1')
+
+
+class BitGrid:
+
+    """
+        Drop-in replacement for Grid on the 4x4 board, keeping the board in
+        a single int. A move is four row table lookups, plus two transposes
+        for up and down, and cloning copies one int.
+    """
+
+    __slots__ = ('size', 'board', 'depth')
+
+    def __init__(self, size=4, board=0):
+        if size != SIZE:
+            raise Exception("BitGrid only supports a 4x4 board!")
+        self.size = size
+        self.board = board
+        self.depth = 0
+
+    @classmethod
+    def fromGrid(cls, grid):
+        bitGrid = cls(grid.size)
+        for x in range(grid.size):
+            for y in range(grid.size):
+                bitGrid.setCellValue((x, y), grid.map[x][y])
+        return bitGrid
+
+    def toGrid(self):
+        grid = Grid(self.size)
+        grid.map = self.map
+        return grid
+
+    # Tiles as a list of lists, a fresh copy on every read
+    @property
+    def map(self):
+        board = self.board
+        return [[(1 << cell) if cell else 0
+                 for cell in _rowCells((board >> (16 * x)) & ROW_MASK)]
+                for x in range(SIZE)]
+
+    # Make a Copy of This Object
+    def clone(self):
+        gridCopy = BitGrid(self.size, self.board)
+        gridCopy.depth = self.depth
+        return gridCopy
+
+    # Insert a Tile in an Empty Cell
+    def insertTile(self, pos, value):
+        self.setCellValue(pos, value)
+
+    def setCellValue(self, pos, value):
+        shift = 4 * (SIZE * pos[0] + pos[1])
+        exponent = value.bit_length() - 1 if value else 0
+        self.board = ((self.board & ~(CELL_MASK << shift))
+                      | (exponent << shift))
+
+    def getCellValue(self, pos):
+        if self.crossBound(pos):
+            return None
+        cell = (self.board >> (4 * (SIZE * pos[0] + pos[1]))) & CELL_MASK
+        return (1 << cell) if cell else 0
+
+    # Return All the Empty Cells
+    def getAvailableCells(self):
+        mask = emptyMask(self.board)
+        cells = []
+        while mask:
+            lowest = mask & -mask
+            cells.append(divmod(lowest.bit_length() // 4, SIZE))
+            mask ^= lowest
+        return cells
+
+    # Return the Tile with Maximum Value
+    def getMaxTile(self):
+        board = self.board
+        exponent = 0
+        while board:
+            exponent = max(exponent, board & CELL_MASK)
+            board >>= 4
+        return (1 << exponent) if exponent else 0
+
+    # Check If Able to Insert a Tile in Position
+    def canInsert(self, pos):
+        return self.getCellValue(pos) == 0
+
+    # Move the Grid
+    def move(self, dir):
+        board = moveBoard(self.board, int(dir))
+        moved = board != self.board
+        self.board = board
+        return moved
+
+    def canMove(self, dirs=vecIndex):
+        # Like Grid.canMove: any empty cell allows a move in any direction
+        board = self.board
+        if emptyMask(board):
+            return True
+
+        dirs = set(dirs)
+        if dirs & {LEFT, RIGHT}:
+            if any(rowCanMerge[(board >> (16 * x)) & ROW_MASK]
+                   for x in range(SIZE)):
+                return True
+        if dirs & {UP, DOWN}:
+            columns = transpose(board)
+            if any(rowCanMerge[(columns >> (16 * y)) & ROW_MASK]
+                   for y in range(SIZE)):
+                return True
+        return False
+
+    # Return All Available Moves, with Their Boards If withResults
+    def getAvailableMoves(self, dirs=vecIndex, withResults=False):
+        board = self.board
+        availableMoves = []
+        for dir in dirs:
+            result = moveBoard(board, dir)
+            if result != board:
+                availableMoves.append((dir, result) if withResults else dir)
+        return availableMoves
+
+    # Move in Place, Returning an Undo Token or None If Nothing Moves
+    def makeMove(self, dir, result=None):
+        # Either token is just the board before the change
+        token = self.board
+        if result is None:
+            result = moveBoard(token, int(dir))
+            if result == token:
+                return None
+        self.board = result
+        return token
+
+    # Insert a Tile in Place, Returning an Undo Token
+    def makeInsert(self, pos, value):
+        token = self.board
+        self.setCellValue(pos, value)
+        return token
+
+    # Take Back a makeMove or makeInsert
+    def undo(self, token):
+        self.board = token
+
+    def crossBound(self, pos):
+        return pos[0] < 0 or \
+               pos[0] >= self.size or \
+               pos[1] < 0 or \
+               pos[1] >= self.size
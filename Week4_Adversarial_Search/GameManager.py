@@ -1,8 +1,10 @@
 from Grid import Grid
+from BitGrid import BitGrid
 from ComputerAI import ComputerAI
 from PlayerAI import PlayerAI
 from Displayer import Displayer
 from random import randint
+import sys
 import time
 
 defaultInitialTiles = 2
@@ -23,8 +25,11 @@ allowance = 0.05
 
 
 class GameManager:
-    def __init__(self, size=4):
-        self.grid = Grid(size)
+    # Headless games (realTime=False and no displayer) neither print nor
+    # wait out the rest of each turn
+    def __init__(self, size=4, gridClass=Grid, realTime=True,
+                 timeLimit=timeLimit):
+        self.grid = gridClass(size)
         self.possibleNewTiles = [2, 4]
         self.probability = defaultProbability
         self.initTiles = defaultInitialTiles
@@ -32,6 +37,16 @@ class GameManager:
         self.playerAI = None
         self.displayer = None
         self.over = False
+        # Why the game was stopped early, None when it ended normally
+        self.overReason = None
+        self.realTime = realTime
+        self.timeLimit = timeLimit
+        self.maxTile = 0
+        self.moves = 0
+        # Seconds taken by each PlayerAI move
+        self.moveTimes = []
+        # Spawned 4s, which scored nothing, see getScore
+        self.fours = 0
 
     def setComputerAI(self, computerAI):
         self.computerAI = computerAI
@@ -43,25 +58,32 @@ class GameManager:
         self.displayer = displayer
 
     def updateAlarm(self, currTime):
-        if currTime - self.prevTime > timeLimit + allowance:
+        if currTime - self.prevTime > self.timeLimit + allowance:
+            if not self.over:
+                self.overReason = 'time limit'
             self.over = True
         else:
-            while time.clock() - self.prevTime < timeLimit + allowance:
-                pass
+            if self.realTime:
+                # Sleep out the rest of the turn rather than spin
+                remaining = (self.prevTime + self.timeLimit + allowance
+                             - time.perf_counter())
+                if remaining > 0:
+                    time.sleep(remaining)
 
-            self.prevTime = time.clock()
+            self.prevTime = time.perf_counter()
 
     def start(self):
         for i in range(self.initTiles):
             self.insertRandonTile()
 
-        self.displayer.display(self.grid)
+        verbose = self.displayer is not None
+        if verbose:
+            self.displayer.display(self.grid)
 
         # Player AI Goes First
         turn = PLAYER_TURN
-        maxTile = 0
 
-        self.prevTime = time.clock()
+        self.prevTime = time.perf_counter()
 
         while not self.isGameOver() and not self.over:
             # Copy to Ensure AI Cannot Change the Real Grid to Cheat
@@ -70,9 +92,16 @@ class GameManager:
             move = None
 
             if turn == PLAYER_TURN:
-                print("Player's Turn:", end="")
-                move = self.playerAI.getMove(gridCopy)
-                print(actionDic[move])
+                if verbose:
+                    print("Player's Turn:", end="")
+                # The player's search stops by the end of the time limit
+                moveStart = time.perf_counter()
+                deadline = moveStart + self.timeLimit
+                move = self.playerAI.getMove(gridCopy, deadline=deadline)
+                self.moveTimes.append(time.perf_counter() - moveStart)
+                self.moves += 1
+                if verbose:
+                    print(actionDic.get(move))
 
                 # Validate Move
                 if move is not None and move >= 0 and move < 4:
@@ -80,32 +109,41 @@ class GameManager:
                         self.grid.move(move)
 
                         # Update maxTile
-                        maxTile = self.grid.getMaxTile()
+                        self.maxTile = self.grid.getMaxTile()
                     else:
-                        print("Invalid PlayerAI Move")
+                        if verbose:
+                            print("Invalid PlayerAI Move")
                         self.over = True
+                        self.overReason = 'invalid player move'
                 else:
-                    print("Invalid PlayerAI Move - 1")
+                    if verbose:
+                        print("Invalid PlayerAI Move - 1")
                     self.over = True
+                    self.overReason = 'invalid player move'
             else:
-                print("Computer's turn:")
+                if verbose:
+                    print("Computer's turn:")
                 move = self.computerAI.getMove(gridCopy)
 
                 # Validate Move
                 if move and self.grid.canInsert(move):
                     self.grid.setCellValue(move, self.getNewTileValue())
                 else:
-                    print("Invalid Computer AI Move")
+                    if verbose:
+                        print("Invalid Computer AI Move")
                     self.over = True
+                    self.overReason = 'invalid computer move'
 
-            if not self.over:
+            if not self.over and verbose:
                 self.displayer.display(self.grid)
 
             # Exceeding the Time Allotted for Any Turn Terminates the Game
-            self.updateAlarm(time.clock())
+            self.updateAlarm(time.perf_counter())
 
             turn = 1 - turn
-        print(maxTile)
+        if verbose:
+            print(self.maxTile)
+        return self.maxTile
 
     def isGameOver(self):
         return not self.grid.canMove()
@@ -114,8 +152,19 @@ class GameManager:
         if randint(0, 99) < 100 * self.probability:
             return self.possibleNewTiles[0]
         else:
+            self.fours += 1
             return self.possibleNewTiles[1]
 
+    def getScore(self):
+        # A merge scores the new tile, so a tile 2^k built up from 2s earned
+        # (k - 1) * 2^k; a spawned 4 never merged and earned nothing
+        score = 0
+        for row in self.grid.map:
+            for value in row:
+                if value > 2:
+                    score += (value.bit_length() - 2) * value
+        return score - 4 * self.fours
+
     def insertRandonTile(self):
         tileValue = self.getNewTileValue()
         cells = self.grid.getAvailableCells()
@@ -124,8 +173,9 @@ class GameManager:
 
 
 def main():
-    gameManager = GameManager()
-    playerAI = PlayerAI()
+    gameManager = GameManager(gridClass=BitGrid)
+    # Optional search mode, minimax or expectimax
+    playerAI = PlayerAI(mode=sys.argv[1]) if len(sys.argv) > 1 else PlayerAI()
     computerAI = ComputerAI()
     displayer = Displayer()
 
@@ -160,18 +160,56 @@ class Grid:
 
         return False
 
-    # Return All Available Moves
-    def getAvailableMoves(self, dirs=vecIndex):
+    # Return the Map After a Move, or None If Nothing Moves
+    def movedMap(self, dir):
+        # Moves a row by row copy, leaving this grid as it is
+        current = self.map
+        self.map = [row[:] for row in current]
+        moved = self.move(dir)
+        (result, self.map) = (self.map, current)
+
+        return result if moved else None
+
+    # Return All Available Moves, with Their Maps If withResults
+    def getAvailableMoves(self, dirs=vecIndex, withResults=False):
         availableMoves = []
 
         for x in dirs:
-            gridCopy = self.clone()
+            result = self.movedMap(x)
 
-            if gridCopy.move(x):
-                availableMoves.append(x)
+            if result is not None:
+                availableMoves.append((x, result) if withResults else x)
 
         return availableMoves
 
+    # Move in Place, Returning an Undo Token or None If Nothing Moves
+    def makeMove(self, dir, result=None):
+        # result is the map getAvailableMoves already computed for dir
+        if result is None:
+            result = self.movedMap(dir)
+
+            if result is None:
+                return None
+
+        token = self.map
+        self.map = result
+
+        return token
+
+    # Insert a Tile in Place, Returning an Undo Token
+    def makeInsert(self, pos, value):
+        self.setCellValue(pos, value)
+
+        return tuple(pos)
+
+    # Take Back a makeMove or makeInsert
+    def undo(self, token):
+        # An insert's token is its cell, a move's the map before it
+        if isinstance(token, tuple):
+            self.map[token[0]][token[1]] = 0
+        else:
+            self.map = token
+
     def crossBound(self, pos):
         return pos[0] < 0 or \
                pos[0] >= self.size or \
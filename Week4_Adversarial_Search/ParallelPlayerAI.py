@@ -0,0 +1,126 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+from time import perf_counter
+
+from BaseAI import BaseAI
+from BitGrid import BitGrid
+from Grid import vecIndex
+from PlayerAI import PlayerAI
+from TranspositionTable import board_key
+
+# The player of each worker process, kept for the whole game
+_player = None
+
+# Share of the turn kept back for a sequential search when no worker
+# answers in time
+FALLBACK_SHARE = 0.1
+
+
+def _startWorker(options):
+    global _player
+    _player = PlayerAI(**options)
+
+
+def _ready():
+    pass
+
+
+def _searchAfterMove(board, deadline):
+    if deadline is not None and perf_counter() >= deadline:
+        # Started too late, the move is already decided
+        return ({}, False)
+    return _player.searchAfterMove(BitGrid(board=board), deadline)
+
+
+class ParallelPlayerAI(BaseAI):
+
+    """
+        Searches each legal root move's subtree in its own worker process.
+        The pool, and the transposition table of every worker, live as long
+        as the player, so create one per game and close it afterwards.
+        Boards travel as packed ints. The workers deepen against the same
+        deadline, and moves are compared at the deepest depth every one of
+        them completed. The workers stop FALLBACK_SHARE of the turn early,
+        so when none of them answers the player still has that long to
+        search sequentially instead.
+
+        The pool defaults to one worker per direction, so every root move
+        starts at once whatever the core count. Fewer cores only share the
+        time among the workers. With fewer workers than legal moves, the
+        queued moves would start late, so the player searches sequentially
+        for the whole turn instead.
+    """
+
+    __slots__ = ('_executor', '_workers', '_player', 'completed_depth')
+
+    def __init__(self, workers=None, **options):
+        # options are passed on to each worker's PlayerAI
+        self._workers = workers or len(vecIndex)
+        # Built first, so forked workers inherit its evaluation tables
+        self._player = PlayerAI(**options)
+        self._executor = ProcessPoolExecutor(max_workers=self._workers,
+                                             initializer=_startWorker,
+                                             initargs=(options,))
+        # Start every worker now rather than during the first turns
+        wait([self._executor.submit(_ready) for _ in range(self._workers)])
+        self.completed_depth = 0
+
+    def getMove(self, grid=None, deadline=None):
+        moves = BitGrid(board=board_key(grid)).getAvailableMoves(
+            withResults=True)
+        self.completed_depth = 0
+        if len(moves) <= 1:
+            # Nothing to choose between
+            return moves[0][0] if moves else None
+        if len(moves) > self._workers:
+            # Queued moves would start late and get little time
+            move = self._player.getMove(grid, deadline)
+            self.completed_depth = self._player.completed_depth
+            return move
+
+        workerDeadline = deadline
+        timeout = None
+        if deadline is not None:
+            start = perf_counter()
+            workerDeadline = deadline - FALLBACK_SHARE * max(0, deadline -
+                                                             start)
+            timeout = workerDeadline - start
+        futures = dict((self._executor.submit(_searchAfterMove, board,
+                                              workerDeadline), move)
+                       for (move, board) in moves)
+        (done, pending) = wait(futures, timeout=timeout)
+        # Searches still running return at the deadline by themselves
+        for future in pending:
+            future.cancel()
+        # (utilities by depth, final) of every move searched in time
+        results = dict((futures[future], future.result()) for future in done
+                       if future.result()[0])
+        if not results:
+            # Searches within the share of the turn kept back
+            move = self._player.getMove(grid, deadline)
+            self.completed_depth = self._player.completed_depth
+            return move
+
+        # A final utility holds at any depth, the others are compared at
+        # the deepest depth all of them completed
+        depths = [max(utilities) for (utilities, final) in results.values()
+                  if not final]
+        depth = min(depths) if depths else max(
+            max(utilities) for (utilities, _) in results.values())
+        self.completed_depth = depth
+
+        def utility(move):
+            (utilities, _) = results[move]
+            return utilities[min(depth, max(utilities))]
+
+        # Ties go to the first move in direction order, as in PlayerAI
+        return max((move for (move, _) in moves if move in results),
+                   key=utility)
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
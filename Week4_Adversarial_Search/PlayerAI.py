@@ -1,34 +1,163 @@
-from itertools import chain
+import gc
+from contextlib import contextmanager
+from random import Random
+from time import perf_counter
 
 from BaseAI import BaseAI
+from RowEvaluator import RowEvaluator
+from TranspositionTable import (TranspositionTable, board_key, EXACT,
+                                LOWER_BOUND, UPPER_BOUND)
+
+(MINIMAX, EXPECTIMAX) = ('minimax', 'expectimax')
+MODES = (MINIMAX, EXPECTIMAX)
+
+# Nodes searched between two looks at the clock
+CLOCK_CHECK_INTERVAL = 64
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+@contextmanager
+def _collector_paused():
+    """
+        Keeps the cyclic garbage collector out of a timed search. A full
+        collection can stall for tens of milliseconds, far more than the
+        safety margin, while the search itself frees its nodes by reference
+        counting. Collection resumes between moves.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 
 class PlayerAI(BaseAI):
 
-    __slots__ = ('_tiles', '_max_depth')
+    """
+        Minimax treats the computer as an adversary placing the worst tile.
+        Expectimax averages over its placements instead, weighting the tiles
+        by how often the GameManager draws them.
+    """
+
+    __slots__ = ('_tiles', '_max_depth', '_table', '_mode',
+                 '_tile_probabilities', '_probability_cutoff',
+                 '_max_chance_cells', '_rng', '_search_depth',
+                 '_depth_limit', '_safety_margin', '_deadline', '_nodes',
+                 '_depth_reached', '_root_move', '_evaluator',
+                 'completed_depth')
 
-    def __init__(self):
+    def __init__(self, table_bits=18, mode=MINIMAX, probability=0.9,
+                 probability_cutoff=0.001, max_chance_cells=6, seed=None,
+                 depth_limit=20, safety_margin=0.01, weights=None):
+        if mode not in MODES:
+            raise Exception(f"Unknown mode '{mode}', choose one of "
+                            f"{', '.join(MODES)}")
         self._tiles = [2, 4]
         # http://cs229.stanford.edu/proj2016/report/NieHouAn-AIPlays2048-report.pdf
         self._max_depth = 4
+        # Kept for the whole game, boards recur across moves too
+        self._table = TranspositionTable(bits=table_bits)
+        self._mode = mode
+        # GameManager.defaultProbability of drawing a 2
+        self._tile_probabilities = ((2, probability), (4, 1 - probability))
+        # Chance branches less likely than this are scored without search
+        self._probability_cutoff = probability_cutoff
+        # Chance nodes with more empty cells than this sample that many
+        self._max_chance_cells = max_chance_cells
+        self._rng = Random(seed)
+        # Depth of the current iteration, _max_depth without a deadline
+        self._search_depth = self._max_depth
+        self._depth_limit = depth_limit
+        # Seconds kept back to unwind the search and return the move
+        self._safety_margin = safety_margin
+        self._deadline = None
+        self._nodes = 0
+        self._depth_reached = False
+        # Best move of the last completed iteration, searched first
+        self._root_move = None
+        self.completed_depth = 0
+        # Leaf scores, see RowEvaluator.DEFAULT_WEIGHTS for the features
+        self._evaluator = RowEvaluator(weights)
 
     def _terminal_test(self, grid=None):
-        return not grid.canMove() or self._max_depth <= grid.depth
+        self._nodes += 1
+        if (self._deadline is not None
+                and not self._nodes % CLOCK_CHECK_INTERVAL
+                and perf_counter() >= self._deadline):
+            raise _SearchTimeout()
+        if not grid.canMove():
+            return True
+        if self._search_depth <= grid.depth:
+            # A deeper iteration would search past this leaf
+            self._depth_reached = True
+            return True
+        return False
+
+    def _order_moves(self, grid, children, entry):
+        """
+            Moves the likeliest best move to the front: at the root the last
+            iteration's choice, elsewhere the one stored in the table
+        """
+        if not grid.depth and self._root_move is not None:
+            preferred = self._root_move
+        elif entry is not None:
+            preferred = entry[5]
+        else:
+            return children
+        if preferred in children:
+            children.remove(preferred)
+            children.insert(0, preferred)
+        return children
+
+    def _probe(self, key, depth, alpha, beta):
+        """
+            Returns (cutoff, entry): cutoff is True when a stored result
+            searched at least as deep settles this node
+        """
+        entry = self._table.lookup(key)
+        if entry is None:
+            return (False, None)
+        (_, _, entry_depth, bound, value, _) = entry
+        if entry_depth >= depth and (
+                bound == EXACT or
+                (bound == LOWER_BOUND and value >= beta) or
+                (bound == UPPER_BOUND and value <= alpha)):
+            return (True, entry)
+        return (False, entry)
 
     def _maximize(self, grid=None, alpha=float('-Inf'), beta=float('Inf')):
 
         if self._terminal_test(grid):
             return (None, self._eval_function(grid))
 
-        (max_child, max_utility) = (None, float('-Inf'))
+        depth = self._search_depth - grid.depth
+        # Player and computer nodes of the same board are told apart
+        key = board_key(grid) << 1
+        (cutoff, entry) = self._probe(key, depth, alpha, beta)
+        # The root always searches, so it always returns a move
+        if cutoff and grid.depth:
+            # Its subtree may have stopped at the depth limit
+            self._depth_reached = True
+            return (entry[5], entry[4])
 
-        children = grid.getAvailableMoves()
-        # for tile in self._tiles:
+        # Boards after each move, reused when the move is made
+        results = dict(grid.getAvailableMoves(withResults=True))
+        # The move that was best before is the likeliest cutoff
+        children = self._order_moves(grid, list(results), entry)
+
+        original_alpha = alpha
+        (max_child, max_utility) = (None, float('-Inf'))
         for child in children:
-            _grid = grid.clone()
-            _grid.depth = grid.depth + 1
-            _grid.move(child)
-            (_, utility) = self._minimize(_grid, alpha=alpha, beta=beta)
+            token = grid.makeMove(child, results[child])
+            grid.depth += 1
+            (_, utility) = self._minimize(grid, alpha=alpha, beta=beta)
+            grid.depth -= 1
+            grid.undo(token)
 
             if utility > max_utility:
                 (max_child, max_utility) = (child, utility)
@@ -36,6 +165,14 @@ class PlayerAI(BaseAI):
             if beta <= max_utility:
                 break
             alpha = max(max_utility, alpha)
+
+        if max_utility >= beta:
+            bound = LOWER_BOUND
+        elif max_utility <= original_alpha:
+            bound = UPPER_BOUND
+        else:
+            bound = EXACT
+        self._table.store(key, depth, bound, max_utility, max_child)
         return (max_child, max_utility)
 
     def _minimize(self, grid, alpha=float('-Inf'), beta=float('Inf')):
@@ -43,47 +180,195 @@ class PlayerAI(BaseAI):
         if self._terminal_test(grid):
             return (None, self._eval_function(grid))
 
+        depth = self._search_depth - grid.depth
+        key = (board_key(grid) << 1) | 1
+        (cutoff, entry) = self._probe(key, depth, alpha, beta)
+        if cutoff:
+            self._depth_reached = True
+            return (None, entry[4])
+
+        cells = grid.getAvailableCells()
+        children = [(tile, cell) for tile in self._tiles for cell in cells]
+        if entry is not None and entry[5] in children:
+            children.remove(entry[5])
+            children.insert(0, entry[5])
+
+        original_beta = beta
         (min_child, min_utility) = (None, float('Inf'))
+        for (tile, cell) in children:
+            token = grid.makeInsert(cell, tile)
+            grid.depth += 1
+            (_, utility) = self._maximize(grid, alpha=alpha, beta=beta)
+            grid.depth -= 1
+            grid.undo(token)
 
-        children = grid.getAvailableCells()
-        for tile in self._tiles:
-            for child in children:
-                _grid = grid.clone()
-                _grid.depth = grid.depth + 1
-                _grid.insertTile(child, tile)
-                (_, utility) = self._maximize(_grid, alpha=alpha, beta=beta)
+            if utility < min_utility:
+                (min_child, min_utility) = ((tile, cell), utility)
 
-                if utility < min_utility:
-                    (min_child, min_utility) = (_grid, utility)
+            if min_utility <= alpha:
+                break
+            beta = min(min_utility, beta)
 
-                if min_utility <= alpha:
-                    break
-                beta = min(min_utility, beta)
+        if min_utility <= alpha:
+            bound = UPPER_BOUND
+        elif min_utility >= original_beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self._table.store(key, depth, bound, min_utility, min_child)
         return (min_child, min_utility)
 
-    def _eval_function(self, grid=None):
-        # Simple strategy: ensure higher number of empty cells after each move
-        h1 = len(grid.getAvailableCells()) / (grid.size**2)
+    def _expect_max(self, grid, probability=1.0):
+
+        if self._terminal_test(grid):
+            return (None, self._eval_function(grid))
+
+        depth = self._search_depth - grid.depth
+        key = board_key(grid) << 1
+        entry = self._table.lookup(key)
+        if entry is not None and entry[2] >= depth and grid.depth:
+            self._depth_reached = True
+            return (entry[5], entry[4])
+
+        results = dict(grid.getAvailableMoves(withResults=True))
+        children = self._order_moves(grid, list(results), entry)
+
+        (max_child, max_utility) = (None, float('-Inf'))
+        for child in children:
+            token = grid.makeMove(child, results[child])
+            grid.depth += 1
+            utility = self._expect_chance(grid, probability)
+            grid.depth -= 1
+            grid.undo(token)
+
+            if utility > max_utility:
+                (max_child, max_utility) = (child, utility)
+
+        self._table.store(key, depth, EXACT, max_utility, max_child)
+        return (max_child, max_utility)
+
+    def _expect_chance(self, grid, probability):
+        """
+            Expected utility over the computer's placements. probability is
+            the chance of reaching this node, and branches whose own chance
+            falls below the cutoff are evaluated instead of searched.
+        """
 
-        # Clustering Penalty
-        penalty = 0
-        total_sum = sum(chain.from_iterable(grid.map))
-        # Adjacent cells are penalized for being greater than current cell
-        for i in range(grid.size):
-            for j in range(i, grid.size - 1):
-                penalty += abs(grid.map[i][j + 1] - grid.map[i][j])
+        if self._terminal_test(grid):
+            return self._eval_function(grid)
 
-        for i in range(grid.size):
-            for j in range(i, grid.size - 1):
-                penalty += abs(grid.map[j][i + 1] - grid.map[j][i])
+        cells = grid.getAvailableCells()
+        if len(cells) > self._max_chance_cells:
+            # Mostly empty boards: a sample of the cells estimates the mean
+            cells = self._rng.sample(cells, self._max_chance_cells)
 
-        h2 = penalty / (2 * total_sum)
-        return h1 - h2
+        cell_probability = probability / len(cells)
+        expected_utility = 0
+        for cell in cells:
+            for (tile, tile_probability) in self._tile_probabilities:
+                branch_probability = cell_probability * tile_probability
+                token = grid.makeInsert(cell, tile)
+                grid.depth += 1
+                if branch_probability < self._probability_cutoff:
+                    utility = self._eval_function(grid)
+                else:
+                    (_, utility) = self._expect_max(grid, branch_probability)
+                grid.depth -= 1
+                grid.undo(token)
+                expected_utility += tile_probability * utility
+        return expected_utility / len(cells)
+
+    def _eval_function(self, grid=None):
+        return self._evaluator.evaluate(board_key(grid))
 
-    def getMove(self, grid=None):
+    def _search(self, grid):
+        # One copy per search, made and unmade in place at every node. A
+        # timeout leaves it mid-line, the caller's grid stays intact.
+        grid = grid.clone()
         grid.depth = 0
-        (move, _) = self._maximize(grid,
-                                   alpha=float('-Inf'),
-                                   beta=float('Inf'))
+        if self._mode == EXPECTIMAX:
+            result = self._expect_max(grid)
+        else:
+            result = self._maximize(grid, alpha=float('-Inf'),
+                                    beta=float('Inf'))
+        # Searched first by the next, deeper iteration
+        self._root_move = result[0]
+        return result
+
+    def _search_chance(self, grid):
+        grid = grid.clone()
+        # The root move is the first ply
+        grid.depth = 1
+        if self._mode == EXPECTIMAX:
+            return self._expect_chance(grid, 1.0)
+        (_, utility) = self._minimize(grid, alpha=float('-Inf'),
+                                      beta=float('Inf'))
+        return utility
+
+    def _deepen(self, search, deadline, first_depth=1):
+        """
+            Runs search() one ply deeper at a time until the deadline passes.
+            Returns the results of the iterations that completed, by depth,
+            and whether the last one is final because no line reached the
+            depth limit.
+        """
+        self._deadline = deadline - self._safety_margin
+        self.completed_depth = 0
+        results = {}
+        exhausted = False
+        try:
+            for depth in range(first_depth, self._depth_limit + 1):
+                self._search_depth = depth
+                self._depth_reached = False
+                results[depth] = search()
+                self.completed_depth = depth
+                # Every line ended the game, deeper searches see no more
+                if not self._depth_reached:
+                    exhausted = True
+                    break
+        except _SearchTimeout:
+            # Results stored by the aborted iteration are complete subtrees
+            pass
+        finally:
+            self._deadline = None
+        return (results, exhausted)
+
+    def searchAfterMove(self, grid=None, deadline=None):
+        """
+            Utility of the computer's turn on grid, the board after one of
+            the root moves, by search depth counted from the root, and
+            whether the deepest utility is final. Used to search root moves
+            in parallel, see ParallelPlayerAI.
+        """
+        self._table.new_search()
+        self._root_move = None
+        if deadline is None:
+            self._search_depth = self._max_depth
+            self.completed_depth = self._max_depth
+            return ({self._max_depth: self._search_chance(grid)}, False)
+        with _collector_paused():
+            return self._deepen(lambda: self._search_chance(grid), deadline,
+                                first_depth=2)
+
+    def getMove(self, grid=None, deadline=None):
+        """
+            Searches to _max_depth, or with a perf_counter deadline deepens
+            one ply at a time until it passes and returns the move of the
+            deepest iteration that completed
+        """
+        self._table.new_search()
+        self._root_move = None
+        if deadline is None:
+            self._search_depth = self._max_depth
+            (move, _) = self._search(grid)
+            self.completed_depth = self._max_depth
+            return move
 
+        with _collector_paused():
+            self._deepen(lambda: self._search(grid), deadline)
+        move = self._root_move
+        if move is None:
+            # Out of time before even one ply completed
+            moves = grid.getAvailableMoves()
+            move = moves[0] if moves else None
         return move
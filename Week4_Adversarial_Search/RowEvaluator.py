@@ -0,0 +1,95 @@
+from BitGrid import SIZE, ROW_MASK, CELL_MASK, transpose
+
+# Features scored per row, bonuses weighted up and penalties down
+FEATURES = ('empty', 'merges', 'monotonicity', 'smoothness')
+DEFAULT_WEIGHTS = {
+    'empty': 270.0,
+    'merges': 700.0,
+    'monotonicity': -47.0,
+    'smoothness': -10.0,
+}
+# Large tiles out of order cost far more than small ones
+MONOTONICITY_POWER = 4
+
+_featureTables = None
+# Weighted row scores by weights, shared by every player in the process
+_scoreTables = {}
+
+
+def row_features(row):
+    """
+        (empty, merges, monotonicity, smoothness) of a packed row of tile
+        exponents. Merges count neighbouring equal tiles once the empty cells
+        are squeezed out, monotonicity is the weight out of order in the
+        better of the two directions and smoothness the sum of exponent gaps
+        between neighbouring tiles.
+    """
+    cells = [(row >> (4 * y)) & CELL_MASK for y in range(SIZE)]
+    tiles = [cell for cell in cells if cell]
+    empty = SIZE - len(tiles)
+
+    merges = 0
+    smoothness = 0
+    for (left, right) in zip(tiles, tiles[1:]):
+        if left == right:
+            merges += 1
+        smoothness += abs(left - right)
+
+    (increasing, decreasing) = (0, 0)
+    for (left, right) in zip(cells, cells[1:]):
+        gap = left ** MONOTONICITY_POWER - right ** MONOTONICITY_POWER
+        if gap > 0:
+            increasing += gap
+        else:
+            decreasing -= gap
+    monotonicity = min(increasing, decreasing)
+
+    return (empty, merges, monotonicity, smoothness)
+
+
+def feature_tables():
+    """
+        One table per feature over all 65536 rows, built on first use
+    """
+    global _featureTables
+    if _featureTables is None:
+        _featureTables = tuple(zip(*(row_features(row)
+                                     for row in range(ROW_MASK + 1))))
+    return _featureTables
+
+
+class RowEvaluator:
+
+    """
+        Scores a packed board as the sum of a precomputed weighted score of
+        each of its four rows and four columns, so an evaluation is eight
+        table lookups and a transpose however rich the features are.
+    """
+
+    __slots__ = ('weights', 'row_scores')
+
+    def __init__(self, weights=None):
+        weights = weights or {}
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise Exception(f"Unknown features {', '.join(sorted(unknown))}, "
+                            f"choose from {', '.join(FEATURES)}")
+        self.weights = dict(DEFAULT_WEIGHTS, **weights)
+        factors = tuple(self.weights[feature] for feature in FEATURES)
+        if factors not in _scoreTables:
+            _scoreTables[factors] = [
+                sum(factor * value for (factor, value) in zip(factors, values))
+                for values in zip(*feature_tables())]
+        self.row_scores = _scoreTables[factors]
+
+    def evaluate(self, board):
+        scores = self.row_scores
+        columns = transpose(board)
+        return (scores[board & ROW_MASK]
+                + scores[(board >> 16) & ROW_MASK]
+                + scores[(board >> 32) & ROW_MASK]
+                + scores[(board >> 48) & ROW_MASK]
+                + scores[columns & ROW_MASK]
+                + scores[(columns >> 16) & ROW_MASK]
+                + scores[(columns >> 32) & ROW_MASK]
+                + scores[(columns >> 48) & ROW_MASK])
@@ -0,0 +1,179 @@
+"""
+    Headless Self-Play
+
+    Plays seeded games of PlayerAI against ComputerAI across a pool of
+    worker processes, without display or pacing, and summarizes the max
+    tiles, scores, game lengths and move latencies. Game i uses seed
+    seed + i, so a run can be repeated exactly apart from timing. A move
+    slower than the time limit plus the game's allowance would lose a timed
+    game, so any such move makes the run exit with status 1. So does a game
+    the GameManager stopped early, over time or on an invalid move; those
+    are reported by reason and left out of the tile, score and length
+    statistics.
+
+        python SelfPlay.py --games 1000 --mode expectimax --time-limit 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from BitGrid import BitGrid
+from ComputerAI import ComputerAI
+from GameManager import GameManager, timeLimit, allowance
+from ParallelPlayerAI import ParallelPlayerAI
+from PlayerAI import PlayerAI, MODES, MINIMAX
+
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def play_game(seed, mode, time_limit, root_workers=None):
+    """
+        Worker entry point, plays one game and returns its record. With
+        root_workers the player searches its root moves in a pool of its
+        own.
+    """
+    # GameManager and ComputerAI draw tiles from the random module
+    random.seed(seed)
+    gameManager = GameManager(gridClass=BitGrid, realTime=False,
+                              timeLimit=time_limit)
+    if root_workers:
+        playerAI = ParallelPlayerAI(workers=root_workers, mode=mode,
+                                    seed=seed)
+    else:
+        playerAI = PlayerAI(mode=mode, seed=seed)
+    gameManager.setPlayerAI(playerAI)
+    gameManager.setComputerAI(ComputerAI())
+    try:
+        maxTile = gameManager.start()
+    finally:
+        if root_workers:
+            playerAI.close()
+    return dict(seed=seed, max_tile=maxTile, score=gameManager.getScore(),
+                moves=gameManager.moves,
+                # None, 'time limit' or the side that made an invalid move
+                abort_reason=gameManager.overReason,
+                latencies=gameManager.moveTimes,
+                slow_moves=sum(latency > time_limit + allowance
+                               for latency in gameManager.moveTimes))
+
+
+def percentile(ordered, p):
+    """
+        Nearest rank percentile of an ascending list
+    """
+    if not ordered:
+        return 0
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(records, output_file=sys.stdout):
+    if not records:
+        return
+
+    print(f"Games: {len(records)}", file=output_file)
+    reasons = Counter(record['abort_reason'] for record in records
+                      if record['abort_reason'])
+    print(f"Aborted: {sum(reasons.values())}", file=output_file)
+    for reason in sorted(reasons):
+        print(f"  {reason}: {reasons[reason]}", file=output_file)
+
+    # Aborted games say nothing about the player's strength
+    finished = [record for record in records if not record['abort_reason']]
+    if finished:
+        summarize_strength(finished, output_file)
+
+    latencies = sorted(latency for record in records
+                       for latency in record['latencies'])
+    print("\nMove latency (ms) over", len(latencies), "moves",
+          file=output_file)
+    print("  ".join(f"p{p:g} {1000 * percentile(latencies, p):.2f}"
+                    for p in LATENCY_PERCENTILES)
+          + f"  max {1000 * latencies[-1]:.2f}" if latencies else "",
+          file=output_file)
+    print("Moves over the time limit and allowance:",
+          sum(record['slow_moves'] for record in records), file=output_file)
+
+
+def summarize_strength(records, output_file):
+    """
+        Max tile, score and length statistics of the finished games
+    """
+    games = len(records)
+    print(f"\nFinished games: {games}", file=output_file)
+
+    print("\nMax tile     games    share  at least", file=output_file)
+    tiles = Counter(record['max_tile'] for record in records)
+    at_least = games
+    for tile in sorted(tiles):
+        print(f"{tile:8} {tiles[tile]:9} {tiles[tile] / games:8.1%} "
+              f"{at_least / games:9.1%}", file=output_file)
+        at_least -= tiles[tile]
+
+    print("\n                 mean    median       min       max",
+          file=output_file)
+    for field in ('score', 'moves'):
+        values = sorted(record[field] for record in records)
+        print(f"{field.capitalize():10} {sum(values) / games:10.1f} "
+              f"{percentile(values, 50):9} {values[0]:9} {values[-1]:9}",
+              file=output_file)
+
+
+def run_games(games, seed=0, mode=MINIMAX, time_limit=timeLimit,
+              workers=None, root_workers=None, record_file=None):
+    """
+        Plays the games across the pool, writing each record to
+        record_file as it arrives, and returns them all
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = range(seed, seed + games)
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for record in executor.map(play_game, seeds, repeat(mode),
+                                   repeat(time_limit), repeat(root_workers)):
+            records.append(record)
+            if record_file is not None:
+                record_file.write(json.dumps(record) + '\n')
+                record_file.flush()
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play headless 2048 games")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the first game")
+    parser.add_argument('--mode', choices=MODES, default=MINIMAX)
+    parser.add_argument('--time-limit', type=float, default=timeLimit,
+                        help="seconds per move, defaults to the game's")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes, defaults to the core count")
+    parser.add_argument('--root-workers', type=int, default=None,
+                        help="search each game's root moves in parallel "
+                             "with this many processes per game")
+    parser.add_argument('--output', default=None,
+                        help="file for one JSON record per game")
+    args = parser.parse_args(argv)
+
+    record_file = open(args.output, 'w') if args.output else None
+    try:
+        records = run_games(args.games, seed=args.seed, mode=args.mode,
+                            time_limit=args.time_limit, workers=args.workers,
+                            root_workers=args.root_workers,
+                            record_file=record_file)
+    finally:
+        if record_file is not None:
+            record_file.close()
+    summarize(records)
+    return 1 if any(record['slow_moves'] or record['abort_reason']
+                    for record in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+from array import array
+
+(EXACT, LOWER_BOUND, UPPER_BOUND) = range(3)
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_HASH_MASK = (1 << 64) - 1
+
+
+def board_key(grid):
+    """
+        The board as one int of 4 bit log2 tile exponents. BitGrid already
+        holds it, a Grid is packed cell by cell.
+    """
+    board = getattr(grid, 'board', None)
+    if board is None:
+        board = 0
+        shift = 0
+        for row in grid.map:
+            for value in row:
+                if value:
+                    board |= (value.bit_length() - 1) << shift
+                shift += 4
+    return board
+
+
+def _encode_move(move):
+    """
+        A move as a small int: None, a player direction 0-3, or a computer
+        placement (tile, (x, y)) numbered after the directions
+    """
+    if move is None:
+        return -1
+    if isinstance(move, int):
+        return move
+    (tile, (x, y)) = move
+    return 4 + ((tile >> 2) << 4 | x << 2 | y)
+
+
+def _decode_move(code):
+    if code < 4:
+        return None if code < 0 else code
+    code -= 4
+    return (2 << (code >> 4), ((code >> 2) & 3, code & 3))
+
+
+class TranspositionTable:
+
+    """
+        Fixed size table of search results, indexed by a multiplicative hash
+        of the full key. Each slot keeps one entry
+        (key, generation, depth, bound, value, best move); a new entry
+        replaces one from an earlier search or one searched no deeper, so
+        memory stays bounded over a whole game. Every field lives in its own
+        preallocated array, so a full table is a handful of flat buffers
+        rather than a quarter million tuples for the garbage collector to
+        walk. Keys take up to 65 bits: the low 64 go in keys and the rest
+        in key_tops.
+    """
+
+    __slots__ = ('bits', 'keys', 'key_tops', 'generations', 'depths',
+                 'bounds', 'values', 'moves', 'generation', 'hits', 'stores')
+
+    def __init__(self, bits=18):
+        self.bits = bits
+        self.clear()
+        self.hits = 0
+        self.stores = 0
+
+    def _index(self, key):
+        return ((key * _HASH_MULTIPLIER) & _HASH_MASK) >> (64 - self.bits)
+
+    def new_search(self):
+        # Entries of earlier searches stay usable but are replaced first
+        self.generation += 1
+
+    def lookup(self, key):
+        index = self._index(key)
+        # An empty slot has depth -1
+        if self.depths[index] >= 0 and self.keys[index] == key & _HASH_MASK \
+                and self.key_tops[index] == key >> 64:
+            self.hits += 1
+            return (key, self.generations[index], self.depths[index],
+                    self.bounds[index], self.values[index],
+                    _decode_move(self.moves[index]))
+        return None
+
+    def store(self, key, depth, bound, value, move):
+        index = self._index(key)
+        if self.generations[index] != self.generation or \
+                self.depths[index] <= depth:
+            self.keys[index] = key & _HASH_MASK
+            self.key_tops[index] = key >> 64
+            self.generations[index] = self.generation
+            self.depths[index] = depth
+            self.bounds[index] = bound
+            self.values[index] = value
+            self.moves[index] = _encode_move(move)
+            self.stores += 1
+
+    def clear(self):
+        size = 1 << self.bits
+        self.keys = array('Q', bytes(8 * size))
+        self.key_tops = array('B', bytes(size))
+        self.generations = array('L', bytes(array('L').itemsize * size))
+        self.depths = array('h', [-1]) * size
+        self.bounds = array('B', bytes(size))
+        self.values = array('d', bytes(8 * size))
+        self.moves = array('b', bytes(size))
+        self.generation = 0